@@ -0,0 +1,224 @@
+"""Build a reference-shade catalogue from a folder of shade images.
+
+Images are processed on a process pool and recorded in a content-hash
+manifest next to the output (`<output>.manifest.json`), so a rebuild only
+runs detect_shade_color on new or changed images. The catalogue and the
+manifest are both written atomically.
+
+Layouts:
+    single      <data>/<shade>.jpg                        -> {shade: [colours]}
+    lighting    <data>/<shade>/*CloseUp*|*IndoorLight*|*NaturalLight*
+                                                          -> {shade: {lighting: [colours]}}
+    lighting4   <data>/<shade>/* keyed closeup/indoor/natural, else default
+
+    python -m app.catalogue_builder lighting4 --workers 4
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from app.config import Settings
+from app.services.shade_catalogue import atomic_write_json
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png")
+
+# layout -> (default data dir, default output catalogue)
+LAYOUTS = {
+    "single": (Settings.NEW_DATA_DIR, Settings.N_SHADE_PATH),
+    "lighting": (Settings.DATA_DIR, Settings.SHADE_PATH),
+    "lighting4": (Settings.NEW4_DATA_DIR, Settings.N4_SHADE_PATH),
+}
+
+MANIFEST_VERSION = 1
+
+
+def lighting_key(layout, filename):
+    """Lighting key of an image inside a shade folder, None to skip it."""
+    if layout == "lighting":
+        for marker, key in (("CloseUp", "closeup"), ("IndoorLight", "indoor_light"), ("NaturalLight", "natural_light")):
+            if marker in filename:
+                return key
+        return None
+    filename = filename.lower()
+    if "closeup" in filename:
+        return "closeup"
+    if "indoor" in filename:
+        return "indoor_light"
+    if "natural" in filename:
+        return "natural_light"
+    return "default"
+
+
+def discover_images(layout, data_dir):
+    """[(path, shade, lighting key or None)] in a stable order.
+
+    When several images map to the same (shade, key), the last one in
+    sorted order wins, as in the per-layout scripts.
+    """
+    data_dir = Path(data_dir)
+    images = []
+    if layout == "single":
+        for path in sorted(data_dir.iterdir()):
+            if path.is_file() and path.suffix.lower() in IMAGE_SUFFIXES:
+                images.append((path, path.stem, None))
+        return images
+
+    for shade_dir in sorted(p for p in data_dir.iterdir() if p.is_dir()):
+        for path in sorted(shade_dir.iterdir()):
+            if not path.is_file():
+                continue
+            key = lighting_key(layout, path.name)
+            if key is not None:
+                images.append((path, shade_dir.name, key))
+    return images
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_params():
+    """Settings that change what detect_shade_color returns.
+
+    A manifest built with different params is ignored as a whole.
+    """
+    return {
+        "version": MANIFEST_VERSION,
+        "quantizer": Settings.QUANTIZER_BACKEND,
+        "quantizer_sample_size": Settings.QUANTIZER_SAMPLE_SIZE,
+    }
+
+
+def manifest_path(out_path):
+    out_path = Path(out_path)
+    return out_path.with_name(out_path.name + ".manifest.json")
+
+
+def load_manifest(path):
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    if manifest.get("params") != build_params():
+        return {}
+    return manifest.get("images", {})
+
+
+def _average_color(path):
+    """labcolor_2's fallback entry: the mean colour at 100% (black for an empty image)."""
+    from PIL import Image
+    import numpy as np
+    from app.services.color_metrics import lab_entry
+    pixels = np.asarray(Image.open(path).convert("RGB")).reshape(-1, 3)
+    color = pixels.mean(axis=0).astype(int).tolist() if len(pixels) else [0, 0, 0]
+    return {"color": color, "percentage": 100.0, "lab": lab_entry(color)}
+
+
+def _shade_colors(path, layout):
+    # Imported here so only the pool workers pay for the model imports
+    from app.services.hair_color_detector import detect_shade_color
+    colors = detect_shade_color(path)
+    if not colors and layout == "single":
+        # labcolor_2 fell back to the average colour when clustering gave
+        # nothing, so single-layout shades always have an entry
+        colors = [_average_color(path)]
+    return colors
+
+
+def assemble_catalogue(layout, images, colors_by_path):
+    catalogue = {}
+    for path, shade, key in images:
+        colors = colors_by_path.get(str(path))
+        if colors is None:
+            continue
+        if layout == "single":
+            catalogue[shade] = colors
+        else:
+            catalogue.setdefault(shade, {})[key] = colors
+    return catalogue
+
+
+def build_catalogue(layout, data_dir=None, out_path=None, workers=None, force=False):
+    """Build (or incrementally rebuild) one catalogue. Returns a summary dict."""
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout: {layout!r} (expected one of {sorted(LAYOUTS)})")
+    default_data, default_out = LAYOUTS[layout]
+    data_dir = Path(data_dir or default_data)
+    out_path = Path(out_path or default_out)
+    if not data_dir.is_dir():
+        raise FileNotFoundError(f"Shade image folder not found at: {data_dir}")
+
+    images = discover_images(layout, data_dir)
+    previous = {} if force else load_manifest(manifest_path(out_path))
+
+    manifest, colors_by_path, todo = {}, {}, []
+    for path, _, _ in images:
+        rel = str(path.relative_to(data_dir))
+        sha = file_sha256(path)
+        cached = previous.get(rel)
+        if cached is not None and cached["sha256"] == sha:
+            manifest[rel] = cached
+            colors_by_path[str(path)] = cached["colors"]
+        else:
+            todo.append((path, rel, sha))
+
+    failed = []
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            futures = {pool.submit(_shade_colors, path, layout): (path, rel, sha) for path, rel, sha in todo}
+            for future in as_completed(futures):
+                path, rel, sha = futures[future]
+                try:
+                    colors = future.result()
+                except Exception as e:
+                    # Left out of the manifest, so the next build retries it
+                    print(f"[ERROR] {rel}: {e}")
+                    failed.append(rel)
+                    continue
+                manifest[rel] = {"sha256": sha, "colors": colors}
+                colors_by_path[str(path)] = colors
+                print(f"[INFO] Processed {rel}")
+
+    catalogue = assemble_catalogue(layout, images, colors_by_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_json(out_path, catalogue)
+    # Written after the catalogue: a crash in between only costs a recompute
+    atomic_write_json(manifest_path(out_path), {"params": build_params(), "images": dict(sorted(manifest.items()))})
+
+    return {
+        "output": str(out_path),
+        "shades": len(catalogue),
+        "images": len(images),
+        "processed": len(todo) - len(failed),
+        "reused": len(images) - len(todo),
+        "failed": failed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a reference-shade catalogue")
+    parser.add_argument("layout", choices=sorted(LAYOUTS))
+    parser.add_argument("--data", help="shade image folder (default depends on the layout)")
+    parser.add_argument("--out", help="catalogue JSON to write (default: the catalogue the API serves)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="ignore the manifest and reprocess every image")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    summary = build_catalogue(args.layout, args.data, args.out, args.workers, args.force)
+    print(f"[DONE] {summary['shades']} shades → {summary['output']} "
+          f"({summary['processed']} processed, {summary['reused']} reused, {len(summary['failed'])} failed) "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
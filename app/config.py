@@ -1,3 +1,5 @@
+import os
+import uuid
 from pathlib import Path
 
 class Settings:
@@ -5,15 +7,105 @@ class Settings:
     BASE_DIR = Path(__file__).resolve().parent.parent
     DATA_DIR = BASE_DIR / "data"
     NEW_DATA_DIR = BASE_DIR / "new_data"
-    NEW4_DATA_DIR = BASE_DIR / "new4_data"
+    NEW4_DATA_DIR = BASE_DIR / "New4_Data"
     MODEL_DIR = BASE_DIR / "model"
     MODEL_PATH = MODEL_DIR / "model.pth"
+    # Parser backend: "torch" loads MODEL_PATH, "onnx" loads an artifact
+    # written by `python -m app.model_export` (fp32 or int8)
+    PARSER_BACKEND = os.getenv("PARSER_BACKEND", "torch")
+    PARSER_ONNX_PATH = Path(os.getenv("PARSER_ONNX_PATH", str(MODEL_DIR / "bisenet.onnx")))
+    # "full" takes the 19-class argmax at 512x512; "hair" decides hair vs
+    # rest at 1/8 resolution and only upsamples that single mask
+    PARSER_MODE = os.getenv("PARSER_MODE", "full")
     SHADE_PATH = BASE_DIR / "app" / "shade" / "reference_shades.json"
     N_SHADE_PATH = BASE_DIR / "app" / "shade" / "reference_shades_single.json"
     N4_SHADE_PATH = BASE_DIR / "app" / "shade" / "reference_shades_4dta.json"
+    # JSON catalogue /product/upload-product used to rewrite
+    PRODUCT_SHADE_PATH = BASE_DIR / "reference_shades.json"
+    # SQLite shade store behind /product/upload-product; seeded once from
+    # PRODUCT_SHADE_PATH when it is created
+    PRODUCT_SHADE_DB = Path(os.getenv("PRODUCT_SHADE_DB", str(BASE_DIR / "reference_shades.db")))
     # print(f"SHADE_PATH: {SHADE_PATH}")
     UPLOAD_DIR = BASE_DIR / "uploaded_images"
     RESULT_DIR = BASE_DIR / "result_images"
+    # Background removal: rembg model (u2net, u2netp, isnet-general-use,
+    # silueta, ...) and ONNX Runtime thread counts (0 = ORT default)
+    REMBG_MODEL = os.getenv("REMBG_MODEL", "u2net")
+    ORT_INTRA_OP_THREADS = int(os.getenv("ORT_INTRA_OP_THREADS", "0"))
+    ORT_INTER_OP_THREADS = int(os.getenv("ORT_INTER_OP_THREADS", "0"))
+    # CPU worker pool for the match pipeline: "thread" or "process" mode,
+    # number of workers and how many requests may wait for a free worker
+    # before new ones get a 503 with Retry-After
+    WORKER_MODE = os.getenv("WORKER_MODE", "thread")
+    WORKER_COUNT = int(os.getenv("WORKER_COUNT", str(min(4, os.cpu_count() or 1))))
+    WORKER_QUEUE_SIZE = int(os.getenv("WORKER_QUEUE_SIZE", "8"))
+    RETRY_AFTER_SECONDS = int(os.getenv("RETRY_AFTER_SECONDS", "5"))
+    # Micro-batching of BiSeNet forward passes across concurrent requests:
+    # how long to wait for more inputs (0 disables batching) and the
+    # largest batch. Only useful with several threads in one process.
+    PARSER_BATCH_WINDOW_MS = float(os.getenv("PARSER_BATCH_WINDOW_MS", "0"))
+    PARSER_MAX_BATCH = int(os.getenv("PARSER_MAX_BATCH", "8"))
+    # Dominant-colour clustering: "kmeans" (exact, all pixels), "sample"
+    # (KMeans on a random subsample), "minibatch" or "histogram" (weighted
+    # KMeans on a 32^3 RGB histogram)
+    QUANTIZER_BACKEND = os.getenv("QUANTIZER_BACKEND", "kmeans")
+    QUANTIZER_SAMPLE_SIZE = int(os.getenv("QUANTIZER_SAMPLE_SIZE", "20000"))
+    # Nearest-neighbour pre-selection when a request asks for top_k shades:
+    # "kdtree", "balltree" or "none" (score the whole catalogue), and how
+    # many more candidates than top_k to fetch. Smaller catalogues are
+    # scored in full.
+    SHADE_INDEX = os.getenv("SHADE_INDEX", "kdtree")
+    SHADE_INDEX_MIN_SHADES = int(os.getenv("SHADE_INDEX_MIN_SHADES", "500"))
+    SHADE_INDEX_OVERSAMPLE = int(os.getenv("SHADE_INDEX_OVERSAMPLE", "4"))
+    # Colour difference used for matching: "rgb" (Euclidean RGB) or a
+    # perceptual Lab metric: "cie76", "cie94", "ciede2000". ΔE values are
+    # multiplied by DELTAE_SCALE (about the RGB/ΔE ratio on hair colours)
+    # so the RGB-tuned score tiers keep their meaning.
+    MATCH_METRIC = os.getenv("MATCH_METRIC", "rgb")
+    DELTAE_SCALE = float(os.getenv("DELTAE_SCALE", "4.0"))
+    # Longest image side used for analysis (background removal, parsing
+    # input, hair pixels, clustering); 0 keeps the upload's full resolution
+    ANALYSIS_MAX_SIDE = int(os.getenv("ANALYSIS_MAX_SIDE", "0"))
+    # Result cache for repeated uploads: LRU entries per process (0 = off),
+    # time to live, and an optional SQLite file shared by all workers
+    RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "256"))
+    RESULT_CACHE_TTL_SECONDS = int(os.getenv("RESULT_CACHE_TTL_SECONDS", "3600"))
+    RESULT_CACHE_DB = os.getenv("RESULT_CACHE_DB", "")
+    # Upload limits: bytes per image, bytes per request (checked against
+    # Content-Length before the body is parsed) and decoded pixels per image
+    UPLOAD_MAX_MB = int(os.getenv("UPLOAD_MAX_MB", "20"))
+    UPLOAD_MAX_REQUEST_MB = int(os.getenv("UPLOAD_MAX_REQUEST_MB", "64"))
+    UPLOAD_MAX_PIXELS = int(os.getenv("UPLOAD_MAX_PIXELS", "50000000"))
+    # Background product ingest: job database (resumed after a restart),
+    # where uploaded images wait for their job, and clustering threads
+    INGEST_JOB_DB = Path(os.getenv("INGEST_JOB_DB", str(BASE_DIR / "ingest_jobs.db")))
+    INGEST_DIR = Path(os.getenv("INGEST_DIR", str(BASE_DIR / "ingest_jobs")))
+    INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "3"))
+    # Background removal before parsing: "always" (rembg cutout), "never"
+    # (parse the original; the hair class already excludes background) or
+    # "auto" (rembg only when the mean hair probability is below the minimum)
+    BACKGROUND_REMOVAL = os.getenv("BACKGROUND_REMOVAL", "always")
+    BACKGROUND_REMOVAL_MIN_CONFIDENCE = float(os.getenv("BACKGROUND_REMOVAL_MIN_CONFIDENCE", "0.9"))
+    # "auto" fallback: rembg and the second parse only see the hair box of
+    # the first parse, grown by this fraction of its size on every side
+    BACKGROUND_REMOVAL_CROP_PADDING = float(os.getenv("BACKGROUND_REMOVAL_CROP_PADDING", "0.25"))
+    if BACKGROUND_REMOVAL_CROP_PADDING < 0:
+        raise ValueError(f"BACKGROUND_REMOVAL_CROP_PADDING must be >= 0, got {BACKGROUND_REMOVAL_CROP_PADDING}")
+    # Hair region used for colour extraction, from the parsing map: keep
+    # only the bottom fraction of the hair box (1.0 = all of it) and grow
+    # the hair mask by a square kernel of this many parsing-map pixels (0 = off)
+    HAIR_ROI_BOTTOM_FRACTION = float(os.getenv("HAIR_ROI_BOTTOM_FRACTION", "1.0"))
+    HAIR_ROI_DILATION = int(os.getenv("HAIR_ROI_DILATION", "0"))
+    if not 0.0 < HAIR_ROI_BOTTOM_FRACTION <= 1.0:
+        raise ValueError(f"HAIR_ROI_BOTTOM_FRACTION must be in (0, 1], got {HAIR_ROI_BOTTOM_FRACTION}")
+    if HAIR_ROI_DILATION < 0:
+        raise ValueError(f"HAIR_ROI_DILATION must be >= 0, got {HAIR_ROI_DILATION}")
+    # Most images accepted by /hair/match-hair-color-batch
+    BATCH_MAX_IMAGES = int(os.getenv("BATCH_MAX_IMAGES", "8"))
+    # Add a Server-Timing header with per-stage durations to match responses
+    SERVER_TIMING = os.getenv("SERVER_TIMING", "").lower() in ("1", "true", "yes")
+    # Write intermediate images (cutout, hair overlay) to RESULT_DIR
+    DEBUG_IMAGES = os.getenv("DEBUG_IMAGES", "").lower() in ("1", "true", "yes")
 
     @classmethod
     def ensure_directories(cls):
@@ -21,3 +113,9 @@ class Settings:
         cls.DATA_DIR.mkdir(exist_ok=True)
         cls.UPLOAD_DIR.mkdir(exist_ok=True)
         cls.RESULT_DIR.mkdir(exist_ok=True)
+
+    @classmethod
+    def debug_image_path(cls, stem):
+        """Unique per-request path for a debug image"""
+        cls.RESULT_DIR.mkdir(exist_ok=True)
+        return cls.RESULT_DIR / f"{stem}_{uuid.uuid4().hex}.png"
@@ -2,8 +2,19 @@ import os
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.httpsredirect import HTTPSRedirectMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.routes.hair_extension import router as hair_router
 from app.routes.product_upload import router as product_upload_router
+from app.services.model_registry import load_parser
+from app.services.background_remove import load_session
+from app.services.worker_pool import get_pool, shutdown_pool
+from app.services.shade_store import match_snapshot
+from app.services.hair_pipeline import MATCH_CATALOGUE
+from app.services.upload_guard import max_request_bytes
+from app.services.metrics import render_metrics
+from app.services.result_cache import get_result_cache
+from app.services.ingest_jobs import get_ingest_queue, shutdown_ingest_queue
+from app.config import Settings
 import time
 
 app = FastAPI()
@@ -19,10 +30,63 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def limit_request_size(request: Request, call_next):
+    # Reject oversized bodies from the header alone, before the multipart
+    # parser spools them; per-file limits are enforced while streaming
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit() and int(content_length) > max_request_bytes():
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"Request body is larger than {Settings.UPLOAD_MAX_REQUEST_MB} MB"},
+        )
+    return await call_next(request)
+
+
 # Include routers
 app.include_router(hair_router, prefix="/hair")
 app.include_router(product_upload_router, prefix="/product")
 
+@app.on_event("startup")
+def load_models():
+    # Load and warm the BiSeNet parser and the rembg session once per
+    # worker instead of per request (process pools load their own copies)
+    if Settings.WORKER_MODE == "thread":
+        load_parser()
+        if Settings.BACKGROUND_REMOVAL != "never":
+            load_session()
+    match_snapshot(MATCH_CATALOGUE)
+    get_pool()
+    # Resume product-ingest jobs a previous server left unfinished
+    get_ingest_queue().resume()
+
+@app.on_event("shutdown")
+def stop_workers():
+    shutdown_pool()
+    shutdown_ingest_queue()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text format: stage/request histograms, pool and cache gauges."""
+    pool = get_pool().stats()
+    samples = [
+        ("hair_pool_workers", "gauge", "Pipeline workers in this process.", pool["workers"]),
+        ("hair_pool_queue_size", "gauge", "Requests allowed to wait for a worker.", pool["queue_size"]),
+        ("hair_pool_reserved_slots", "gauge", "Admission slots held; a batch holds one per image.", pool["reserved_slots"]),
+        ("hair_pool_in_flight", "gauge", "Pipeline tasks running on a worker.", pool["in_flight"]),
+        ("hair_pool_queued", "gauge", "Pipeline tasks waiting for a worker.", pool["queued"]),
+    ]
+    cache = get_result_cache()
+    if cache is not None:
+        stats = cache.stats()
+        samples += [
+            ("hair_result_cache_entries", "gauge", "Results held in the in-process cache.", stats["entries"]),
+            ("hair_result_cache_hits_total", "counter", "Result cache hits.", stats["hits"]),
+            ("hair_result_cache_misses_total", "counter", "Result cache misses.", stats["misses"]),
+        ]
+    return PlainTextResponse(render_metrics(samples), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 async def read_root():
     return {"message": "Welcome to the Hair Extension Color Matcher API"}
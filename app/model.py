@@ -12,7 +12,7 @@ from app.resnet import Resnet18
 
 
 class ConvBNReLU(nn.Module):
-    def __init__(self, in_chan, out_chan, ks=3, stride=1, padding=1, *args, **kwargs):
+    def __init__(self, in_chan, out_chan, ks=3, stride=1, padding=1, init_weights=True, *args, **kwargs):
         super(ConvBNReLU, self).__init__()
         self.conv = nn.Conv2d(in_chan,
                 out_chan,
@@ -21,7 +21,8 @@ class ConvBNReLU(nn.Module):
                 padding = padding,
                 bias = False)
         self.bn = nn.BatchNorm2d(out_chan)
-        self.init_weight()
+        if init_weights:
+            self.init_weight()
 
     def forward(self, x):
         x = self.conv(x)
@@ -35,11 +36,12 @@ class ConvBNReLU(nn.Module):
                 if not ly.bias is None: nn.init.constant_(ly.bias, 0)
 
 class BiSeNetOutput(nn.Module):
-    def __init__(self, in_chan, mid_chan, n_classes, *args, **kwargs):
+    def __init__(self, in_chan, mid_chan, n_classes, init_weights=True, *args, **kwargs):
         super(BiSeNetOutput, self).__init__()
-        self.conv = ConvBNReLU(in_chan, mid_chan, ks=3, stride=1, padding=1)
+        self.conv = ConvBNReLU(in_chan, mid_chan, ks=3, stride=1, padding=1, init_weights=init_weights)
         self.conv_out = nn.Conv2d(mid_chan, n_classes, kernel_size=1, bias=False)
-        self.init_weight()
+        if init_weights:
+            self.init_weight()
 
     def forward(self, x):
         x = self.conv(x)
@@ -65,17 +67,18 @@ class BiSeNetOutput(nn.Module):
 
 
 class AttentionRefinementModule(nn.Module):
-    def __init__(self, in_chan, out_chan, *args, **kwargs):
+    def __init__(self, in_chan, out_chan, init_weights=True, *args, **kwargs):
         super(AttentionRefinementModule, self).__init__()
-        self.conv = ConvBNReLU(in_chan, out_chan, ks=3, stride=1, padding=1)
+        self.conv = ConvBNReLU(in_chan, out_chan, ks=3, stride=1, padding=1, init_weights=init_weights)
         self.conv_atten = nn.Conv2d(out_chan, out_chan, kernel_size= 1, bias=False)
         self.bn_atten = nn.BatchNorm2d(out_chan)
         self.sigmoid_atten = nn.Sigmoid()
-        self.init_weight()
+        if init_weights:
+            self.init_weight()
 
     def forward(self, x):
         feat = self.conv(x)
-        atten = F.avg_pool2d(feat, feat.size()[2:])
+        atten = F.adaptive_avg_pool2d(feat, 1)
         atten = self.conv_atten(atten)
         atten = self.bn_atten(atten)
         atten = self.sigmoid_atten(atten)
@@ -90,16 +93,17 @@ class AttentionRefinementModule(nn.Module):
 
 
 class ContextPath(nn.Module):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, pretrained=True, init_weights=True, *args, **kwargs):
         super(ContextPath, self).__init__()
-        self.resnet = Resnet18()
-        self.arm16 = AttentionRefinementModule(256, 128)
-        self.arm32 = AttentionRefinementModule(512, 128)
-        self.conv_head32 = ConvBNReLU(128, 128, ks=3, stride=1, padding=1)
-        self.conv_head16 = ConvBNReLU(128, 128, ks=3, stride=1, padding=1)
-        self.conv_avg = ConvBNReLU(512, 128, ks=1, stride=1, padding=0)
+        self.resnet = Resnet18(pretrained=pretrained)
+        self.arm16 = AttentionRefinementModule(256, 128, init_weights=init_weights)
+        self.arm32 = AttentionRefinementModule(512, 128, init_weights=init_weights)
+        self.conv_head32 = ConvBNReLU(128, 128, ks=3, stride=1, padding=1, init_weights=init_weights)
+        self.conv_head16 = ConvBNReLU(128, 128, ks=3, stride=1, padding=1, init_weights=init_weights)
+        self.conv_avg = ConvBNReLU(512, 128, ks=1, stride=1, padding=0, init_weights=init_weights)
 
-        self.init_weight()
+        if init_weights:
+            self.init_weight()
 
     def forward(self, x):
         H0, W0 = x.size()[2:]
@@ -108,7 +112,7 @@ class ContextPath(nn.Module):
         H16, W16 = feat16.size()[2:]
         H32, W32 = feat32.size()[2:]
 
-        avg = F.avg_pool2d(feat32, feat32.size()[2:])
+        avg = F.adaptive_avg_pool2d(feat32, 1)
         avg = self.conv_avg(avg)
         avg_up = F.interpolate(avg, (H32, W32), mode='nearest')
 
@@ -178,9 +182,9 @@ class SpatialPath(nn.Module):
 
 
 class FeatureFusionModule(nn.Module):
-    def __init__(self, in_chan, out_chan, *args, **kwargs):
+    def __init__(self, in_chan, out_chan, init_weights=True, *args, **kwargs):
         super(FeatureFusionModule, self).__init__()
-        self.convblk = ConvBNReLU(in_chan, out_chan, ks=1, stride=1, padding=0)
+        self.convblk = ConvBNReLU(in_chan, out_chan, ks=1, stride=1, padding=0, init_weights=init_weights)
         self.conv1 = nn.Conv2d(out_chan,
                 out_chan//4,
                 kernel_size = 1,
@@ -195,12 +199,13 @@ class FeatureFusionModule(nn.Module):
                 bias = False)
         self.relu = nn.ReLU(inplace=True)
         self.sigmoid = nn.Sigmoid()
-        self.init_weight()
+        if init_weights:
+            self.init_weight()
 
     def forward(self, fsp, fcp):
         fcat = torch.cat([fsp, fcp], dim=1)
         feat = self.convblk(fcat)
-        atten = F.avg_pool2d(feat, feat.size()[2:])
+        atten = F.adaptive_avg_pool2d(feat, 1)
         atten = self.conv1(atten)
         atten = self.relu(atten)
         atten = self.conv2(atten)
@@ -228,15 +233,29 @@ class FeatureFusionModule(nn.Module):
 
 
 class BiSeNet(nn.Module):
-    def __init__(self, n_classes, *args, **kwargs):
+    def __init__(self, n_classes, inference=False, *args, **kwargs):
         super(BiSeNet, self).__init__()
-        self.cp = ContextPath()
+        ## inference=True builds the bare architecture for loading a full
+        ## checkpoint: no ImageNet backbone download and no kaiming init,
+        ## since load_state_dict overwrites every one of those weights
+        init_weights = not inference
+        self.cp = ContextPath(pretrained=not inference, init_weights=init_weights)
         ## here self.sp is deleted
-        self.ffm = FeatureFusionModule(256, 256)
-        self.conv_out = BiSeNetOutput(256, 256, n_classes)
-        self.conv_out16 = BiSeNetOutput(128, 64, n_classes)
-        self.conv_out32 = BiSeNetOutput(128, 64, n_classes)
-        self.init_weight()
+        self.ffm = FeatureFusionModule(256, 256, init_weights=init_weights)
+        self.conv_out = BiSeNetOutput(256, 256, n_classes, init_weights=init_weights)
+        self.conv_out16 = BiSeNetOutput(128, 64, n_classes, init_weights=init_weights)
+        self.conv_out32 = BiSeNetOutput(128, 64, n_classes, init_weights=init_weights)
+        ## the auxiliary heads only matter for training; in inference mode
+        ## they stay in the module (so checkpoints load strictly) but are skipped
+        self.aux_heads = not inference
+        if init_weights:
+            self.init_weight()
+
+    def forward_logits8(self, x):
+        ## main-head logits at 1/8 of the input resolution, before upsampling
+        feat_res8, feat_cp8, _ = self.cp(x)
+        feat_fuse = self.ffm(feat_res8, feat_cp8)
+        return self.conv_out(feat_fuse)
 
     def forward(self, x):
         H, W = x.size()[2:]
@@ -245,10 +264,13 @@ class BiSeNet(nn.Module):
         feat_fuse = self.ffm(feat_sp, feat_cp8)
 
         feat_out = self.conv_out(feat_fuse)
+        feat_out = F.interpolate(feat_out, (H, W), mode='bilinear', align_corners=True)
+        if not self.aux_heads:
+            return (feat_out,)
+
         feat_out16 = self.conv_out16(feat_cp8)
         feat_out32 = self.conv_out32(feat_cp16)
 
-        feat_out = F.interpolate(feat_out, (H, W), mode='bilinear', align_corners=True)
         feat_out16 = F.interpolate(feat_out16, (H, W), mode='bilinear', align_corners=True)
         feat_out32 = F.interpolate(feat_out32, (H, W), mode='bilinear', align_corners=True)
         return feat_out, feat_out16, feat_out32
@@ -0,0 +1,114 @@
+#!/usr/bin/python
+# -*- encoding: utf-8 -*-
+"""Export the BiSeNet parser for inference.
+
+Loads model.pth into an inference-mode BiSeNet (auxiliary heads skipped),
+folds every BatchNorm into the preceding convolution and writes TorchScript
+and ONNX artifacts, plus an optional dynamically quantised int8 ONNX model.
+
+    python -m app.model_export --out model --int8
+"""
+import argparse
+import inspect
+from pathlib import Path
+
+import torch
+import torch.nn as nn
+from torch.nn.utils.fusion import fuse_conv_bn_eval
+
+from app.config import Settings
+from app.model import BiSeNet
+
+# (conv, bn) attribute pairs used by the blocks in model.py / resnet.py
+CONV_BN_PAIRS = (('conv', 'bn'), ('conv1', 'bn1'), ('conv2', 'bn2'), ('conv_atten', 'bn_atten'))
+
+
+def load_inference_model(model_path=None):
+    net = BiSeNet(n_classes=19, inference=True)
+    net.load_state_dict(torch.load(str(model_path or Settings.MODEL_PATH), map_location=torch.device('cpu')))
+    net.eval()
+    return net
+
+
+def fuse_conv_bn(net):
+    """Fold BatchNorm2d layers into their convolutions, in place."""
+    for module in net.modules():
+        for conv_name, bn_name in CONV_BN_PAIRS:
+            conv = getattr(module, conv_name, None)
+            bn = getattr(module, bn_name, None)
+            if isinstance(conv, nn.Conv2d) and isinstance(bn, nn.BatchNorm2d):
+                setattr(module, conv_name, fuse_conv_bn_eval(conv, bn))
+                setattr(module, bn_name, nn.Identity())
+        # BasicBlock.downsample = Sequential(Conv2d, BatchNorm2d)
+        if isinstance(module, nn.Sequential) and len(module) == 2 \
+                and isinstance(module[0], nn.Conv2d) and isinstance(module[1], nn.BatchNorm2d):
+            module[0] = fuse_conv_bn_eval(module[0], module[1])
+            module[1] = nn.Identity()
+    return net
+
+
+def drop_aux_heads(net):
+    """Remove the training-only auxiliary heads from an inference model."""
+    net.aux_heads = False
+    net.conv_out16 = None
+    net.conv_out32 = None
+    return net
+
+
+def export_torchscript(net, path):
+    example = torch.zeros(1, 3, 512, 512)
+    with torch.no_grad():
+        traced = torch.jit.trace(net, example)
+    traced.save(str(path))
+    return path
+
+
+def export_onnx(net, path, opset=17):
+    example = torch.zeros(1, 3, 512, 512)
+    kwargs = {}
+    # Newer torch defaults to the dynamo exporter; keep the tracing one
+    if 'dynamo' in inspect.signature(torch.onnx.export).parameters:
+        kwargs['dynamo'] = False
+    torch.onnx.export(
+        net, example, str(path),
+        input_names=['input'], output_names=['logits'],
+        dynamic_axes={'input': {0: 'batch'}, 'logits': {0: 'batch'}},
+        opset_version=opset,
+        **kwargs,
+    )
+    return path
+
+
+def quantize_onnx_int8(src_path, dst_path):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(str(src_path), str(dst_path), weight_type=QuantType.QInt8)
+    return dst_path
+
+
+def export_all(model_path=None, out_dir=None, int8=False):
+    """Write bisenet_fused.pt, bisenet.onnx and optionally bisenet_int8.onnx."""
+    out_dir = Path(out_dir or Settings.MODEL_DIR)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    net = drop_aux_heads(fuse_conv_bn(load_inference_model(model_path)))
+
+    artifacts = {
+        'torchscript': export_torchscript(net, out_dir / 'bisenet_fused.pt'),
+        'onnx': export_onnx(net, out_dir / 'bisenet.onnx'),
+    }
+    if int8:
+        artifacts['onnx_int8'] = quantize_onnx_int8(artifacts['onnx'], out_dir / 'bisenet_int8.onnx')
+    return artifacts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the BiSeNet parser for inference")
+    parser.add_argument('--model', default=str(Settings.MODEL_PATH))
+    parser.add_argument('--out', default=str(Settings.MODEL_DIR))
+    parser.add_argument('--int8', action='store_true', help='also write a dynamically quantised int8 ONNX model')
+    args = parser.parse_args()
+    for name, path in export_all(args.model, args.out, args.int8).items():
+        print(f"{name:<12} {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,91 +1,167 @@
+from typing import List, Optional
 
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from app.config import Settings
-from app.services.hair_color_detector import detect_hair_color
-from app.services.best_shade_matcher import find_best_shade,find_best_shade_single,find_best_shade4
-from app.services.background_remove import remove_background
-from pathlib import Path
-import json
-import os
+from app.services.color_metrics import METRICS
+from app.services.hair_pipeline import MATCH_CATALOGUE, match_hair_image_timed, match_hair_images_timed
+from app.services.metrics import record_request, server_timing
+from app.services.result_cache import get_result_cache, result_key
+from app.services.shade_store import match_snapshot
+from app.services.upload_guard import UnsupportedImage, UploadTooLarge, read_upload, sniff_image
+from app.services.worker_pool import PoolSaturated, get_pool
+import hashlib
 import time
 
 router = APIRouter()
 
-def load_shades_rgb(path):
-    path = Path(path)
-    if not path.exists():
-        raise FileNotFoundError(f"Shade data file not found at: {path}")
-    with path.open("r") as f:
-        return json.load(f)
+
+def batch_digest(uploads):
+    return b"".join(hashlib.sha256(data).digest() for data in uploads)
+
 
 @router.post("/match-hair-color")
-async def match_hair_color(file: UploadFile = File(...)):
+async def match_hair_color(
+    response: Response,
+    file: UploadFile = File(...),
+    top_k: Optional[int] = Query(None, ge=1, description="Return only the best top_k shades in all_scores"),
+    metric: Optional[str] = Query(None, description=f"Colour difference, one of {list(METRICS)}"),
+):
+    if metric is not None and metric not in METRICS:
+        raise HTTPException(status_code=400, detail=f"Unknown metric {metric!r}, expected one of {list(METRICS)}")
+    start_time = time.perf_counter()
+    timings, outcome = None, "error"
     try:
         Settings.ensure_directories()  # Ensure all necessary directories exist
-        start_time = time.time()
-        # Step 0: create temp paths
-        upload_path = f"temp_uploadg_{file.filename}"
-        bg_removed_path = "remove_bg.png"
-        # Step 1: save uploaded file temporarily
-        with open(upload_path, "wb") as f:
-            f.write(await file.read())
-
-        # Step 2: remove background
-        
-        remove_bg_path=remove_background(upload_path, bg_removed_path)
-
-        # Step 3: detect hair color from background-removed image
-        detect_response = detect_hair_color(input_path=remove_bg_path)
-        print("user_rgb-------------", detect_response)
-        if detect_response['status_code'] == 400:
-            return {
-                "matched_shade": None,
-                "match_percentage": 0.0,
-                "all_scores": None,
-                "message": "No hair color detected. Please upload a clear image with visible hair."
-            }
-        
-        with open("hair_rgb.json", "r") as f:
-            hair_rgb = json.load(f)
-        os.remove("hair_rgb.json")  # Clean up temp file
-        print('hair rgb--------', hair_rgb)
-        user_rgb = hair_rgb['dominant_hair_colors']
-
-        # Step 4: load shades & find best match
-        
-        shade_data = load_shades_rgb(Settings.N_SHADE_PATH)
-        best, all_scores = find_best_shade_single(user_rgb, shade_data)
-        
-        # shade_data = load_shades_rgb(Settings.SHADE_PATH)
-        # best, all_scores = find_best_shade(user_rgb, shade_data)
-
-        # shade_data = load_shades_rgb(Settings.N4_SHADE_PATH)
-        # best, all_scores = find_best_shade4(user_rgb, shade_data)
-        
-        print("best-------------", best)
-        print("all_scores-------------", all_scores)
-        end_time = time.time()
-        execution_time = end_time - start_time
-        print("execute--------------------",execution_time)
-        import psutil
-        process = psutil.Process(os.getpid())
-        ram_usage = process.memory_info().rss / 1024 ** 2  # MB
-        total_ram = psutil.virtual_memory().total / (1024 ** 3)
-        print(f"Total system RAM: {total_ram:.2f} GB")
-        print("Uses--ram",round(ram_usage, 2))
-
-
-        # Step 5: cleanup temp files
-        os.remove(upload_path)
-        # os.remove(bg_removed_path)
-
-        return {
-            "matched_shade": best,
-            "match_percentage": all_scores[best],
-            "all_scores": all_scores
-        }
+        # Step 1: keep the upload in memory, no shared temp files on disk.
+        # Read in chunks up to the size limit and check the image header
+        # before any model runs
+        upload_bytes = await read_upload(file)
+        sniff_image(upload_bytes, file.filename or "upload")
+
+        # Retries and double posts of the same image are answered from the
+        # result cache without touching the worker pool
+        cache = get_result_cache()
+        if cache is not None:
+            version = (await run_in_threadpool(match_snapshot, MATCH_CATALOGUE)).version
+            # Hashing the upload and the SQLite tier block, so keep them
+            # off the event loop
+            key = await run_in_threadpool(result_key, upload_bytes, version, catalogue=MATCH_CATALOGUE,
+                                          top_k=top_k, metric=metric or Settings.MATCH_METRIC)
+            cached = await run_in_threadpool(cache.get, key)
+            if cached is not None:
+                outcome = "cache_hit"
+                if Settings.SERVER_TIMING:
+                    response.headers["Server-Timing"] = server_timing([], ['cache;desc="hit"'])
+                return {**cached, "cache_hit": True}
+
+        # Steps 2-4 are CPU bound: run them on the worker pool so the event
+        # loop keeps serving other requests
+        result, timings = await get_pool().run(match_hair_image_timed, upload_bytes, top_k, metric)
+        if cache is not None:
+            await run_in_threadpool(cache.put, key, result)
+        outcome = "ok"
+        if Settings.SERVER_TIMING:
+            total = ("total", time.perf_counter() - start_time)
+            response.headers["Server-Timing"] = server_timing(timings["stages"] + [total])
+        return {**result, "cache_hit": False}
 
+    except UploadTooLarge as e:
+        outcome = "rejected"
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedImage as e:
+        outcome = "rejected"
+        raise HTTPException(status_code=415, detail=str(e))
+    except PoolSaturated:
+        outcome = "busy"
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, please retry shortly.",
+            headers={"Retry-After": str(Settings.RETRY_AFTER_SECONDS)},
+        )
     except FileNotFoundError as e:
         raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {e}")
+    finally:
+        record_request(time.perf_counter() - start_time, timings, outcome)
+
+
+@router.post("/match-hair-color-batch")
+async def match_hair_color_batch(
+    response: Response,
+    files: List[UploadFile] = File(...),
+    top_k: Optional[int] = Query(None, ge=1, description="Return only the best top_k shades in all_scores"),
+    metric: Optional[str] = Query(None, description=f"Colour difference, one of {list(METRICS)}"),
+):
+    """Several photos of one head (e.g. front, back, natural light) in one request.
+
+    The top-level match fuses the dominant colours of every image; `images`
+    holds each photo's own match, in upload order.
+    """
+    if metric is not None and metric not in METRICS:
+        raise HTTPException(status_code=400, detail=f"Unknown metric {metric!r}, expected one of {list(METRICS)}")
+    # Every image holds a pool slot, so a batch can never exceed the pool
+    max_images = min(Settings.BATCH_MAX_IMAGES, get_pool().capacity)
+    if len(files) > max_images:
+        raise HTTPException(status_code=400, detail=f"At most {max_images} images per request")
+    start_time = time.perf_counter()
+    timings, outcome = None, "error"
+    try:
+        Settings.ensure_directories()
+        uploads = []
+        for file in files:
+            upload_bytes = await read_upload(file)
+            sniff_image(upload_bytes, file.filename or "upload")
+            uploads.append(upload_bytes)
+
+        cache = get_result_cache()
+        if cache is not None:
+            version = (await run_in_threadpool(match_snapshot, MATCH_CATALOGUE)).version
+            # The ordered per-image digests identify the batch
+            digests = await run_in_threadpool(batch_digest, uploads)
+            key = await run_in_threadpool(result_key, digests, version, catalogue=MATCH_CATALOGUE,
+                                          top_k=top_k, metric=metric or Settings.MATCH_METRIC, batch=True)
+            cached = await run_in_threadpool(cache.get, key)
+            if cached is not None:
+                outcome = "cache_hit"
+                if Settings.SERVER_TIMING:
+                    response.headers["Server-Timing"] = server_timing([], ['cache;desc="hit"'])
+                return {**cached, "cache_hit": True}
+
+        # One pool job for the whole batch, so BiSeNet sees every image at
+        # once; it reserves a slot per image so backpressure sees its size
+        result, timings = await get_pool().run(match_hair_images_timed, uploads, top_k, metric,
+                                               slots=len(uploads))
+        if cache is not None:
+            await run_in_threadpool(cache.put, key, result)
+        outcome = "ok"
+        if Settings.SERVER_TIMING:
+            total = ("total", time.perf_counter() - start_time)
+            response.headers["Server-Timing"] = server_timing(timings["stages"] + [total])
+        return {**result, "cache_hit": False}
+
+    except UploadTooLarge as e:
+        outcome = "rejected"
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedImage as e:
+        outcome = "rejected"
+        raise HTTPException(status_code=415, detail=str(e))
+    except PoolSaturated:
+        outcome = "busy"
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, please retry shortly.",
+            headers={"Retry-After": str(Settings.RETRY_AFTER_SECONDS)},
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {e}")
+    finally:
+        record_request(time.perf_counter() - start_time, timings, outcome, endpoint="match-hair-color-batch")
+
+
+@router.get("/pipeline-stats")
+async def pipeline_stats():
+    """Worker pool occupancy, for sizing workers per core, and result cache counters."""
+    cache = get_result_cache()
+    return {**get_pool().stats(), "result_cache": cache.stats() if cache is not None else None}
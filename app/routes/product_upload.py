@@ -1,40 +1,47 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.services.LabCoolor import build_reference_shades
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from app.config import Settings
+from app.services.ingest_jobs import get_ingest_queue, image_path, job_status
+from app.services.hair_pipeline import MATCH_CATALOGUE
+from app.services.shade_store import get_shade_store, match_snapshot
+from app.services.upload_guard import UnsupportedImage, UploadTooLarge, save_upload, sniff_image
 import shutil
 import uuid
-from pathlib import Path
-import json
-import os
 
 router = APIRouter()
-@router.post("/upload-product")
+
+
+def shade_taken(queue, shade_name):
+    """Whether the name is used by a stored shade, a bundled shade (they
+    win in the match catalogue) or a shade still being ingested."""
+    return bool(get_shade_store().exists(shade_name) or shade_name in match_snapshot(MATCH_CATALOGUE).raw
+                or queue.jobs.active_for_shade(shade_name))
+
+
+@router.post("/upload-product", status_code=202)
 async def upload_product(
     closeup: UploadFile = File(...),
     indoor_light: UploadFile = File(...),
     natural_light: UploadFile = File(...),
     shade_name: str = "UnknownShade"  # You can pass this via query/body
 ):
-   # Load existing reference data before any processing
-    ref_path = Path("reference_shades.json")
-    if ref_path.exists():
-        with open(ref_path, "r") as f:
-            reference_data = json.load(f)
-    else:
-        reference_data = {}
+    # The job and shade stores are SQLite; keep their queries off the
+    # event loop
+    queue = await run_in_threadpool(get_ingest_queue)
 
     # Early check for existing shade name
-    if shade_name in reference_data:
+    if await run_in_threadpool(shade_taken, queue, shade_name):
         raise HTTPException(
             status_code=400,
             detail=f"Shade '{shade_name}' already exists. Please use a different name."
         )
 
-    # Only proceed if shade_name is new
-    # temp_dir = Path(f"temp_{uuid.uuid4().hex}")
-    temp_dir = Path(shade_name)
-    os.makedirs(temp_dir, exist_ok=True)
+    # The images are kept in a per-job dir until the job finishes, so a
+    # restarted server can resume it; the shade name never becomes a path
+    job_id = uuid.uuid4().hex
+    job_dir = Settings.INGEST_DIR / job_id
+    job_dir.mkdir(parents=True)
 
     files = {
         "CloseUp": closeup,
@@ -42,22 +49,37 @@ async def upload_product(
         "NaturalLight": natural_light
     }
 
+    # Stream uploaded files to disk and check each header before queueing
     try:
-        # Save uploaded files
         for tag, file in files.items():
-            file_path = temp_dir / f"{shade_name}_{tag}.png"
-            with open(file_path, "wb") as f:
-                f.write(await file.read())
-
-        # Generate new shade from image files
-        new_shade = build_reference_shades(temp_dir)
-        print("new_shade-------------:", new_shade)
-        # Add new shade and save updated reference file
-        reference_data[shade_name] = new_shade[shade_name]
-        with open(ref_path, "w") as f:
-            json.dump(reference_data, f, indent=2)
-
-        return JSONResponse(content={"message": "Shade uploaded successfully.", "data": new_shade})
-
-    finally:
-        shutil.rmtree(temp_dir)
\ No newline at end of file
+            file_path = image_path(job_dir, tag)
+            await save_upload(file, file_path)
+            sniff_image(file_path, file.filename or tag)
+    except UploadTooLarge as e:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedImage as e:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        raise HTTPException(status_code=415, detail=str(e))
+    except BaseException:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        raise
+
+    # Clustering and the catalogue insert run in the background; poll the
+    # status URL for progress and the final shade signature
+    await run_in_threadpool(queue.submit, shade_name, job_dir, job_id)
+    return JSONResponse(status_code=202, content={
+        "message": "Shade upload accepted.",
+        "job_id": job_id,
+        "status_url": f"/product/upload-jobs/{job_id}",
+    })
+
+
+# Plain def: FastAPI runs it in the threadpool, so the job lookup does not
+# block the event loop
+@router.get("/upload-jobs/{job_id}")
+def upload_job_status(job_id: str):
+    job = get_ingest_queue().jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'.")
+    return job_status(job)
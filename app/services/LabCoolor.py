@@ -1,9 +1,8 @@
 import cv2
 import numpy as np
 from pathlib import Path
-import json
 from app.config import Settings
-from app.services.hair_color_detector import detect_hair_color, detect_shade_color
+from app.services.hair_color_detector import detect_shade_color
 
 DATA_DIR = Settings.DATA_DIR
 
@@ -51,18 +50,9 @@ def build_reference_shades(data_dir):
     return shade_info
 
 def main():
-    shade_signatures = {} 
-    for shade_folder in DATA_DIR.iterdir():
-        print(f"Processing shade folder: {shade_folder.name}")
-        if shade_folder.is_dir():
-            shades_data = build_reference_shades(shade_folder)
-            shade_signatures.update(shades_data)  # dict merge
-           
-    # ✅ Save output
-    os.makedirs("app/shade", exist_ok=True)
-    with open("app/shade/reference_shades.json", "w") as f:
-        json.dump(shade_signatures, f, indent=2)
-    
+    # Parallel, incremental build (see app/catalogue_builder.py)
+    from app.catalogue_builder import build_catalogue
+    print(build_catalogue("lighting", DATA_DIR, "app/shade/reference_shades.json"))
 
 
 if __name__ == "__main__":
@@ -1,16 +1,41 @@
+import io
 from PIL import Image, UnidentifiedImageError
 from pillow_heif import register_heif_opener
 
 # Enable HEIC/HEIF support for Pillow
 register_heif_opener()
 
-def load_image_any_format(input_path: str) -> Image.Image:
+# BOX averages every source pixel, which is what the colour statistics want;
+# reducing_gap=1.0 lets JPEG draft() do as much of the shrinking as it can
+def _shrink(img, max_side):
+    img.thumbnail((max_side, max_side), resample=Image.Resampling.BOX, reducing_gap=1.0)
+
+
+def load_image_any_format(input_path, max_side=None) -> Image.Image:
     """
-    Open an image file safely, regardless of format (JPG, PNG, HEIC, etc.)
-    Always returns an RGB Pillow Image.
+    Open an image safely, regardless of format (JPG, PNG, HEIC, etc.)
+    Accepts a path, raw bytes, a file-like object or an already decoded
+    Pillow Image. Always returns an RGB Pillow Image.
+
+    With max_side, the image is shrunk to fit max_side x max_side before
+    the RGB conversion. JPEGs are decoded at reduced scale (Image.draft),
+    so the full-size buffer is never allocated; other formats (PNG, HEIF)
+    are decoded in full first and then reduced.
     """
+    if isinstance(input_path, Image.Image):
+        img = input_path
+        if max_side and max(img.size) > max_side:
+            img = img.copy()
+            _shrink(img, max_side)
+        return img.convert("RGB")
+    source = io.BytesIO(input_path) if isinstance(input_path, (bytes, bytearray)) else input_path
     try:
-        img = Image.open(input_path).convert("RGB")
-        return img
+        img = Image.open(source)
+        if max_side and max(img.size) > max_side:
+            # thumbnail() calls draft() on the still undecoded image, then
+            # reduce() + a final resample down to max_side
+            _shrink(img, max_side)
+        return img.convert("RGB")
     except UnidentifiedImageError as e:
-        raise ValueError(f"Unsupported or corrupted image format: {input_path}") from e
+        name = "uploaded image" if source is not input_path else input_path
+        raise ValueError(f"Unsupported or corrupted image format: {name}") from e
@@ -1,10 +1,56 @@
-from rembg import remove
+import io
+import threading
+import onnxruntime as ort
+from rembg import new_session, remove
 from PIL import Image
+from app.config import Settings
 
-def remove_background(input_source, output_path: str):
-    """Remove background from an image and save the result to output_path."""
-    input_image = Image.open(input_source).convert("RGBA")
-    output_image = remove(input_image)
-    output_path="remove_bg.png"
-    output_image.save(output_path)
-    return output_path
\ No newline at end of file
+_lock = threading.Lock()
+_session = None
+
+
+def _build_session(model_name):
+    """Create a rembg session with the configured ONNX Runtime threading."""
+    sess_opts = ort.SessionOptions()
+    sess_opts.intra_op_num_threads = Settings.ORT_INTRA_OP_THREADS
+    sess_opts.inter_op_num_threads = Settings.ORT_INTER_OP_THREADS
+    session = new_session(model_name, sess_opts=sess_opts)
+
+    # Warm-up run so the first request does not pay for ORT's lazy init
+    remove(Image.new("RGBA", (64, 64)), session=session)
+    return session
+
+
+def load_session(model_name=None):
+    """Create the shared rembg session once per process and return it."""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = _build_session(model_name or Settings.REMBG_MODEL)
+        return _session
+
+
+def get_session():
+    """Return the long-lived rembg session, creating it on first use."""
+    session = _session
+    if session is None:
+        session = load_session()
+    return session
+
+
+def remove_background(input_source, output_path=None, session=None):
+    """Remove background from an image and return the RGBA cutout.
+
+    input_source may be a path, raw bytes, a file-like object or a Pillow
+    Image. The cutout is only written to disk when output_path is given.
+    """
+    if isinstance(input_source, (bytes, bytearray)):
+        input_source = io.BytesIO(input_source)
+    if isinstance(input_source, Image.Image):
+        input_image = input_source.convert("RGBA")
+    else:
+        input_image = Image.open(input_source).convert("RGBA")
+    output_image = remove(input_image, session=session or get_session())
+    if output_path:
+        output_image.save(output_path)
+    return output_image
@@ -39,25 +39,12 @@ def match_score(user_colors, reference_colors):
 
     return total_score
 
-# ----------------------------------------
-# Step 3: Main function to find best matching shade
-def find_best_shade(user_colors, reference_shades):
-    scores = {}
-    for shade_name, light_types in reference_shades.items():
-        # print(f"Processing shade: {shade_name}")
-        total = 0
-        for light_type in ["closeup", "indoor_light", "natural_light"]:
-            if light_type in light_types:
-                score = match_score1(user_colors, light_types[light_type])
-                total += score
-            scores[shade_name] = round(total / 3, 2)  # average score
-
-    sorted_scores = dict(sorted(scores.items(), key=lambda x: x[1], reverse=True))
-    best_match = next(iter(sorted_scores))  # First key is the best match
-
-    return best_match, sorted_scores
 # ---------------------NEW-------------------
 import numpy as np
+from itertools import islice
+from app.config import Settings
+from app.services.color_metrics import delta_e, resolve_metric, rgb_to_lab
+from app.services.shade_index import nearest_shades, shades_within
 def match_score1(user_colors, shade_colors):
     """Euclidean distance in RGB, converted into similarity score (0-100)."""
     scores = []
@@ -71,33 +58,265 @@ def match_score1(user_colors, shade_colors):
     return np.mean(scores)
 
 
-def find_best_shade_single(user_colors, reference_shades):
-    scores = {}
-    for shade_name, shade_colors in reference_shades.items():
-        score = match_score(user_colors, shade_colors)
-        scores[shade_name] = round(score, 2)
+# ---------------------VECTORISED-------------------
+LIGHTING_KEYS = ("closeup", "indoor_light", "natural_light")
+LIGHTING4_KEYS = ("default", "closeup", "indoor_light", "natural_light")
+
+
+class CompiledShades:
+    """Reference shades packed into flat arrays for broadcasted scoring.
+
+    Every reference colour is one row of `colors` (float32, exact for 8-bit
+    values) with its `weights` (percentage). Rows are grouped by
+    (shade, lighting) and each group is a contiguous slice:
+    `group_start[g]:group_start[g] + group_size[g]`, belonging to shade
+    `group_shade[g]` and lighting `group_light[g]` (index into
+    `light_keys`, always 0 for single-signature catalogues). `lab` holds
+    the same rows in CIE Lab (float64) for the perceptual metrics.
+    """
+
+    def __init__(self, names, light_keys, colors, weights, group_shade, group_light, group_start, group_size,
+                 lab=None):
+        self.names = names
+        self.light_keys = light_keys
+        self.colors = colors
+        self.lab = lab if lab is not None else rgb_to_lab(colors)
+        self.weights = weights
+        self.group_shade = group_shade
+        self.group_light = group_light
+        self.group_start = group_start
+        self.group_size = group_size
+        # Row -> shade index, handy for per-colour lookups
+        self.shade_idx = np.repeat(group_shade, group_size)
+        # Spatial indexes over `colors`, built lazily by shade_index
+        self.indexes = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def subset(self, shade_indices):
+        """CompiledShades restricted to the given shades, in catalogue order."""
+        shade_indices = np.unique(shade_indices)
+        new_shade = np.full(len(self.names), -1, dtype=np.intp)
+        new_shade[shade_indices] = np.arange(len(shade_indices))
+
+        groups = np.nonzero(new_shade[self.group_shade] >= 0)[0]
+        sizes = self.group_size[groups]
+        rows = np.concatenate([np.arange(self.group_start[g], self.group_start[g] + self.group_size[g])
+                               for g in groups]) if len(groups) else np.zeros(0, dtype=np.intp)
+        return CompiledShades(
+            names=[self.names[i] for i in shade_indices],
+            light_keys=self.light_keys,
+            colors=self.colors[rows],
+            lab=self.lab[rows],
+            weights=self.weights[rows],
+            group_shade=new_shade[self.group_shade[groups]],
+            group_light=self.group_light[groups],
+            group_start=np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.intp),
+            group_size=sizes,
+        )
+
+
+def compile_shades(reference_shades, light_keys=None):
+    """Pack a shade catalogue into a CompiledShades.
+
+    With light_keys=None the catalogue is {shade: [colours]}
+    (reference_shades_single.json); otherwise it is
+    {shade: {lighting: [colours]}} and only the given lighting keys are kept.
+    Lab values stored next to "color" are used as is; catalogues built
+    without them are converted here, once.
+    """
+    names, colors, labs, weights = [], [], [], []
+    group_shade, group_light, group_size = [], [], []
+    for shade_idx, (shade_name, entry) in enumerate(reference_shades.items()):
+        names.append(shade_name)
+        if light_keys is None:
+            groups = [(0, entry)]
+        else:
+            groups = [(i, entry[key]) for i, key in enumerate(light_keys) if key in entry]
+        for light_idx, shade_colors in groups:
+            group_shade.append(shade_idx)
+            group_light.append(light_idx)
+            group_size.append(len(shade_colors))
+            for c in shade_colors:
+                colors.append(c["color"])
+                labs.append(c.get("lab"))
+                weights.append(c.get("percentage", 0.0))
+
+    group_size = np.array(group_size, dtype=np.intp)
+    group_start = np.concatenate(([0], np.cumsum(group_size)[:-1])).astype(np.intp)
+    colors = np.array(colors, dtype=np.float32).reshape(-1, 3)
+    if labs and all(lab is not None for lab in labs):
+        lab = np.array(labs, dtype=np.float64).reshape(-1, 3)
+    else:
+        lab = rgb_to_lab(colors)
+    return CompiledShades(
+        names=names,
+        light_keys=tuple(light_keys) if light_keys is not None else None,
+        colors=colors,
+        lab=lab,
+        weights=np.array(weights, dtype=np.float32),
+        group_shade=np.array(group_shade, dtype=np.intp),
+        group_light=np.array(group_light, dtype=np.intp),
+        group_start=group_start,
+        group_size=group_size,
+    )
+
+
+def _user_arrays(user_colors):
+    colors = np.array([uc["color"] for uc in user_colors], dtype=np.float64).reshape(-1, 3)
+    percentages = np.array([uc["percentage"] for uc in user_colors], dtype=np.float64)
+    return colors, percentages
+
+
+def color_distances(user_colors, compiled, metric="rgb"):
+    """(U, R) distances from each user colour to every reference colour.
+
+    "rgb" is the Euclidean RGB distance; the ΔE metrics convert only the
+    user colours to Lab and compare them with the precomputed `lab` rows.
+    """
+    colors, _ = _user_arrays(user_colors)
+    if metric != "rgb":
+        return delta_e(rgb_to_lab(colors), compiled.lab, metric)
+    diff = colors[:, None, :] - compiled.colors.astype(np.float64)[None, :, :]
+    return np.sqrt((diff * diff).sum(axis=2))
+
+
+def _group_min(values, compiled):
+    """Per-group minimum over the last axis; +inf for empty groups."""
+    out = np.full(values.shape[:-1] + (len(compiled.group_size),), np.inf)
+    filled = compiled.group_size > 0
+    if values.shape[-1]:
+        out[..., filled] = np.minimum.reduceat(values, compiled.group_start[filled], axis=-1)
+    return out
+
+
+def _group_mean(values, compiled):
+    """Mean of each group's (U, n) block, flattened user-major.
+
+    Groups are bucketed by size so every bucket is one (G, U * n) array and
+    np.mean(axis=1) sums each row exactly like np.mean on the list the
+    loop-based match_score1 builds.
+    """
+    n_users = values.shape[0]
+    out = np.full(len(compiled.group_size), np.nan)
+    for size in np.unique(compiled.group_size):
+        if size == 0 or n_users == 0:
+            continue
+        groups = np.nonzero(compiled.group_size == size)[0]
+        cols = compiled.group_start[groups][:, None] + np.arange(size)
+        block = values[:, cols].transpose(1, 0, 2).reshape(len(groups), n_users * size)
+        out[groups] = np.ascontiguousarray(block).mean(axis=1)
+    return out
 
-    sorted_scores = dict(sorted(scores.items(), key=lambda x: x[1], reverse=True))
+
+def score_single(user_colors, compiled, metric="rgb"):
+    """match_score for every shade at once, as a float64 array."""
+    _, percentages = _user_arrays(user_colors)
+    best = _group_min(color_distances(user_colors, compiled, metric), compiled)  # (U, G), one group per shade
+
+    tiers = np.select([best < 20, best < 50, best < 80], [100.0, 60.0, 30.0], 0.0)
+    contributions = (tiers * percentages[:, None]) / 100
+    totals = np.zeros(len(compiled))
+    for row in contributions:  # accumulate user colours in order, like match_score
+        totals[compiled.group_shade] += row
+    return totals
+
+
+def score_lighting(user_colors, compiled, n_lights, metric="rgb"):
+    """Average of match_score1 over lighting conditions for every shade."""
+    sims = 100 - np.minimum(color_distances(user_colors, compiled, metric), 100)
+    group_scores = _group_mean(sims, compiled)
+
+    totals = np.zeros(len(compiled))
+    for light_idx in range(len(compiled.light_keys)):  # same order as the loop version
+        groups = compiled.group_light == light_idx
+        totals[compiled.group_shade[groups]] += group_scores[groups]
+    return np.round(totals / n_lights, 2)
+
+
+def _ensure_compiled(reference_shades, light_keys):
+    if isinstance(reference_shades, CompiledShades):
+        return reference_shades
+    return compile_shades(reference_shades, light_keys)
+
+
+def _use_index(compiled, top_k):
+    """Index lookups only pay off on catalogues larger than SHADE_INDEX_MIN_SHADES."""
+    return (top_k is not None and Settings.SHADE_INDEX != "none"
+            and len(compiled) > max(top_k, Settings.SHADE_INDEX_MIN_SHADES))
+
+
+# (radius, best tier a colour can still reach when its nearest shade colour
+# is at least `radius` away) for the staged top_k search in score_single
+SINGLE_TIER_EDGES = ((20, 60.0), (50, 30.0), (80, 0.0))
+
+
+def _single_top_k(user_colors, compiled, top_k, metric):
+    """Exact top_k shades for score_single without scoring the whole catalogue.
+
+    Shades with no colour within `radius` of any user colour score at most
+    `floor` per unit of user percentage, so once the k-th best candidate
+    beats that bound the rest of the catalogue cannot enter the top_k.
+    Past the last edge every other shade scores exactly 0; the first of them
+    in catalogue order pad the result, as the full sort would.
+
+    Needs distances the index can bound, so it runs for "rgb" (RGB space)
+    and "cie76" (Euclidean in Lab); the other metrics score every shade.
+    """
+    if not _use_index(compiled, top_k) or metric not in ("rgb", "cie76"):
+        return compiled, score_single(user_colors, compiled, metric)
+
+    space, scale = ("rgb", 1.0) if metric == "rgb" else ("lab", Settings.DELTAE_SCALE)
+    _, percentages = _user_arrays(user_colors)
+    for radius, floor in SINGLE_TIER_EDGES[:-1]:
+        candidates = shades_within(user_colors, compiled, radius / scale, space)
+        if len(candidates) < top_k:
+            continue
+        subset = compiled.subset(candidates)
+        totals = score_single(user_colors, subset, metric)
+        bound = round(float(floor * percentages.sum() / 100), 2)
+        if np.sort([round(float(t), 2) for t in totals])[-top_k] > bound:
+            return subset, totals
+
+    candidates = shades_within(user_colors, compiled, SINGLE_TIER_EDGES[-1][0] / scale, space)
+    rest = np.setdiff1d(np.arange(len(compiled)), candidates)[:top_k]
+    subset = compiled.subset(np.concatenate((candidates, rest)))
+    return subset, score_single(user_colors, subset, metric)
+
+
+def _candidates(user_colors, compiled, top_k, metric):
+    """Narrow the catalogue to nearest-neighbour candidates when top_k is set."""
+    if not _use_index(compiled, top_k):
+        return compiled
+    space = "rgb" if metric == "rgb" else "lab"
+    return compiled.subset(nearest_shades(user_colors, compiled, top_k, space=space))
+
+
+def _rank(names, values, top_k=None):
+    sorted_scores = dict(sorted(zip(names, values), key=lambda x: x[1], reverse=True))
+    if top_k is not None:
+        sorted_scores = dict(islice(sorted_scores.items(), top_k))
     best_match = next(iter(sorted_scores)) if sorted_scores else None
-    print("sorted_scores",sorted_scores)
     return best_match, sorted_scores
 
 
-def find_best_shade4(user_colors, reference_shades):
-    scores = {}
-    for shade_name, light_types in reference_shades.items():
-        # print(f"Processing shade: {shade_name}")
-        total = 0
-        for light_type in ["default","closeup", "indoor_light", "natural_light"]:
-            if light_type in light_types:
-                score = match_score1(user_colors, light_types[light_type])
-                total += score
-            scores[shade_name] = round(total / 4, 2)  # average score
+def find_best_shade(user_colors, reference_shades, top_k=None, metric=None):
+    metric = resolve_metric(metric)
+    compiled = _candidates(user_colors, _ensure_compiled(reference_shades, LIGHTING_KEYS), top_k, metric)
+    return _rank(compiled.names, score_lighting(user_colors, compiled, 3, metric), top_k)
 
-    sorted_scores = dict(sorted(scores.items(), key=lambda x: x[1], reverse=True))
-    best_match = next(iter(sorted_scores))  # First key is the best match
 
-    return best_match, sorted_scores
+def find_best_shade_single(user_colors, reference_shades, top_k=None, metric=None):
+    metric = resolve_metric(metric)
+    compiled, totals = _single_top_k(user_colors, _ensure_compiled(reference_shades, None), top_k, metric)
+    return _rank(compiled.names, [round(float(t), 2) for t in totals], top_k)
+
+
+def find_best_shade4(user_colors, reference_shades, top_k=None, metric=None):
+    metric = resolve_metric(metric)
+    compiled = _candidates(user_colors, _ensure_compiled(reference_shades, LIGHTING4_KEYS), top_k, metric)
+    return _rank(compiled.names, score_lighting(user_colors, compiled, 4, metric), top_k)
 
 if __name__ == "__main__":
     # ----------------------------------------
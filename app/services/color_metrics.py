@@ -0,0 +1,40 @@
+import numpy as np
+from skimage.color import deltaE_cie76, deltaE_ciede94, deltaE_ciede2000, rgb2lab
+
+from app.config import Settings
+
+DELTA_E = {
+    "cie76": deltaE_cie76,
+    "cie94": deltaE_ciede94,
+    "ciede2000": deltaE_ciede2000,
+}
+# "rgb" is the original Euclidean distance on 0-255 RGB
+METRICS = ("rgb",) + tuple(DELTA_E)
+
+
+def resolve_metric(metric=None):
+    metric = metric or Settings.MATCH_METRIC
+    if metric not in METRICS:
+        raise ValueError(f"Unknown match metric: {metric!r} (expected one of {list(METRICS)})")
+    return metric
+
+
+def rgb_to_lab(colors):
+    """(N, 3) 0-255 RGB values -> (N, 3) float64 CIE Lab (sRGB, D65)."""
+    colors = np.asarray(colors, dtype=np.float64).reshape(-1, 3)
+    return rgb2lab(colors / 255.0)
+
+
+def lab_entry(color):
+    """Lab of one RGB colour as a JSON-friendly list, stored next to "color"."""
+    return [round(float(v), 4) for v in rgb_to_lab(color)[0]]
+
+
+def delta_e(user_lab, ref_lab, metric):
+    """(U, R) colour differences between every user and reference Lab colour.
+
+    Returned in RGB-equivalent units (ΔE * DELTAE_SCALE) so the distance
+    tiers and the 100 cap used by the matchers apply unchanged.
+    """
+    d = DELTA_E[metric](user_lab[:, None, :], ref_lab[None, :, :])
+    return d * Settings.DELTAE_SCALE
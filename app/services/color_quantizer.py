@@ -0,0 +1,115 @@
+import numpy as np
+from sklearn.cluster import KMeans, MiniBatchKMeans
+
+from app.config import Settings
+
+# Histogram backend: 32 levels per channel -> 32^3 bins
+HIST_BITS = 5
+
+
+def _distinct(data):
+    data = data.astype(np.uint32)
+    return len(np.unique((data[:, 0] << 16) | (data[:, 1] << 8) | data[:, 2]))
+
+
+def count_distinct_colors(data, limit=None):
+    """Number of distinct RGB rows in an (N, 3) array of 0-255 values.
+
+    With `limit`, the result is capped at `limit` and the full sort is
+    skipped whenever the first few thousand rows already reach it.
+    """
+    if len(data) == 0:
+        return 0
+    if limit is not None:
+        head = _distinct(data[:4096])
+        if head >= limit:
+            return limit
+        return min(_distinct(data), limit)
+    return _distinct(data)
+
+
+def _counts_per_label(labels, n_clusters, weights=None):
+    return np.bincount(labels, weights=weights, minlength=n_clusters)
+
+
+def quantize_kmeans(data, n_clusters):
+    """Exact KMeans over every pixel (the original behaviour)."""
+    kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init="auto")
+    labels = kmeans.fit_predict(data)
+    return kmeans.cluster_centers_, _counts_per_label(labels, n_clusters)
+
+
+def quantize_sampled_kmeans(data, n_clusters, sample_size=None):
+    """Exact KMeans fitted on a uniform random subsample.
+
+    Every pixel is still assigned to its nearest centre, so the percentages
+    cover the full pixel set.
+    """
+    sample_size = sample_size or Settings.QUANTIZER_SAMPLE_SIZE
+    sample = data
+    if len(data) > sample_size:
+        rng = np.random.default_rng(42)
+        sample = data[rng.choice(len(data), size=sample_size, replace=False)]
+    n_clusters = count_distinct_colors(sample, limit=n_clusters)
+    kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init="auto").fit(sample)
+    labels = kmeans.predict(data)
+    return kmeans.cluster_centers_, _counts_per_label(labels, n_clusters)
+
+
+def quantize_minibatch(data, n_clusters, batch_size=4096, max_steps=100):
+    """MiniBatchKMeans trained with partial_fit on random mini-batches.
+
+    `fit` on millions of rows pays an O(N) cost per step, so the model is
+    fed at most `max_steps` batches (about one pass over the data for
+    typical hair masks) and then every pixel is assigned with `predict`.
+    """
+    rng = np.random.default_rng(42)
+    kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=42, n_init=1, batch_size=batch_size)
+    n_steps = min(max_steps, len(data) // batch_size + 1)
+    for _ in range(n_steps):
+        kmeans.partial_fit(data[rng.integers(0, len(data), size=max(batch_size, n_clusters))])
+    labels = kmeans.predict(data)
+    return kmeans.cluster_centers_, _counts_per_label(labels, n_clusters)
+
+
+def quantize_histogram(data, n_clusters):
+    """Weighted KMeans on the occupied bins of a 32^3 RGB histogram.
+
+    Each occupied bin is represented by the exact mean colour of its
+    pixels and weighted by its pixel count, so KMeans only sees a few
+    thousand points however large the image is.
+    """
+    data = data.astype(np.intp)
+    shift = 8 - HIST_BITS
+    n_bins = 1 << (3 * HIST_BITS)
+    bins = ((data[:, 0] >> shift) << (2 * HIST_BITS)) | ((data[:, 1] >> shift) << HIST_BITS) | (data[:, 2] >> shift)
+    counts = np.bincount(bins, minlength=n_bins)
+    sums = np.stack([np.bincount(bins, weights=data[:, c], minlength=n_bins) for c in range(3)], axis=1)
+    occupied = counts > 0
+    counts = counts[occupied]
+    bin_colors = sums[occupied] / counts[:, None]
+
+    n_clusters = min(n_clusters, len(counts))
+    kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init="auto")
+    kmeans.fit(bin_colors, sample_weight=counts)
+    return kmeans.cluster_centers_, _counts_per_label(kmeans.labels_, n_clusters, weights=counts)
+
+
+BACKENDS = {
+    "kmeans": quantize_kmeans,
+    "sample": quantize_sampled_kmeans,
+    "minibatch": quantize_minibatch,
+    "histogram": quantize_histogram,
+}
+
+
+def quantize_colors(data, n_clusters, backend=None):
+    """Cluster an (N, 3) pixel array into at most n_clusters colours.
+
+    Returns (centers, counts): float centres of shape (k, 3) and the number
+    of pixels (or pixel weight) assigned to each.
+    """
+    backend = backend or Settings.QUANTIZER_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown quantizer backend: {backend!r} (expected one of {sorted(BACKENDS)})")
+    return BACKENDS[backend](data, n_clusters)
@@ -1,15 +1,17 @@
 
-from app.model import BiSeNet
 import torch
-import os.path as osp
 import numpy as np
 from PIL import Image
 import torchvision.transforms as transforms
 import cv2
-import json
-import os
-from sklearn.cluster import KMeans
+from app.services.color_quantizer import count_distinct_colors, quantize_colors
+from app.services.color_metrics import lab_entry
+from app.config import Settings
 from app.services.any_formate import load_image_any_format
+from app.services.model_registry import get_parser
+from app.services.parser_batcher import get_batcher
+from app.services.hair_parser import parse_batch
+from app.services.metrics import stage
 
 
 def similar(G1, B1, R1, G2, B2, R2):
@@ -28,43 +30,38 @@ def similar(G1, B1, R1, G2, B2, R2):
     return max(ar) / min(ar) < 1.55 and br > 0.7 and br < 1.4
 
 
-def get_dominant_colors_from_hair(hair_pixels, n_clusters=3, min_percentage=3):
+def get_dominant_colors_from_hair(hair_pixels, n_clusters=3, min_percentage=3, backend=None):
     # print(f"Extracting dominant colors from hair pixels...{hair_pixels}")
     # if len(hair_pixels) == 0:
     #     return [{"color": [0, 0, 0], "percentage": 100.0}]
     
-    data = np.array(hair_pixels)
+    data = np.asarray(hair_pixels)
 
-    # Remove duplicate rows to avoid KMeans warning
-    unique_colors = np.unique(data, axis=0)
-    actual_clusters = min(len(unique_colors), n_clusters)
+    # No more clusters than distinct colours, to avoid KMeans warning
+    actual_clusters = count_distinct_colors(data, limit=n_clusters)
 
     if actual_clusters == 0:
-        print("there is no cluster [{color: [0, 0, 0], percentage: 100.0}]")
         # return [{"color": [0, 0, 0], "percentage": 100.0}]
         return {"status_code": 400, "error": "No valid clusters could be formed from hair pixels."}
 
     try:
-        kmeans = KMeans(n_clusters=actual_clusters, random_state=42, n_init="auto")
-        labels = kmeans.fit_predict(data)
-        centers = kmeans.cluster_centers_.astype(int)
-
-        counts = np.bincount(labels)
-        total = len(labels)
+        # Settings.QUANTIZER_BACKEND picks exact, sampled, mini-batch or
+        # histogram clustering
+        centers, counts = quantize_colors(data, actual_clusters, backend)
+        centers = centers.astype(int)
+        total = counts.sum()
 
         dominant_colors = []
-        for i in range(actual_clusters):
+        for i in range(len(centers)):
             percentage = (counts[i] / total) * 100
             if percentage >= min_percentage:
                 dominant_colors.append({
                     "color": centers[i].tolist(),
-                    "percentage": round(percentage, 2)
+                    "percentage": float(round(percentage, 2))
                 })
 
         # Ensure at least one color is returned
         if not dominant_colors:
-            avg_color = data.mean(axis=0).astype(int).tolist()
-            print("there is no dominant color: [{color: [0, 0, 0], percentage: 100.0}]" )
             return {"status_code": 400, "error": "No dominant color met the minimum percentage threshold."}
 
         # return dominant_colors
@@ -86,37 +83,101 @@ def get_dominant_colors_from_hair(hair_pixels, n_clusters=3, min_percentage=3):
             "message": f"Failed to extract dominant hair colors: {str(e)}"
         }
 
+def hair_roi(parsing_anno, label=17, bottom_fraction=1.0, dilation=0):
+    """Hair mask on the parsing grid and its bounding box (r0, r1, c0, c1), inclusive.
+
+    `dilation` grows the mask with a square kernel of that many grid pixels
+    (like services/new.py); `bottom_fraction` then keeps only the lower part
+    of the hair box (like highlight_hair_region). The box is None without hair.
+    """
+    if not 0.0 < bottom_fraction <= 1.0:
+        raise ValueError(f"bottom_fraction must be in (0, 1], got {bottom_fraction}")
+    mask = parsing_anno == label
+    if dilation > 0:
+        kernel = np.ones((dilation, dilation), np.uint8)
+        mask = cv2.dilate(mask.astype(np.uint8), kernel, iterations=1).astype(bool)
+    found_rows = np.flatnonzero(mask.any(axis=1))
+    if len(found_rows) == 0:
+        return mask, None
+    r0, r1 = found_rows[0], found_rows[-1]
+    if bottom_fraction < 1.0:
+        r0 = int(r0 + (r1 - r0) * (1 - bottom_fraction))
+        mask[:r0] = False
+    found_cols = np.flatnonzero(mask[r0:r1 + 1].any(axis=0))
+    return mask, (r0, r1, found_cols[0], found_cols[-1])
+
+
+def extract_hair_pixels(origin, parsing_anno, label=17, bottom_fraction=1.0, dilation=0):
+    """Return the pixels of `origin` (BGR) labelled as hair as an (N, 3) uint8 RGB array.
+
+    Every source pixel (x, y) is looked up in the parsing map at
+    (int(x * grid_h / H), int(y * grid_w / W)), i.e. nearest-index sampling.
+    Only the full-resolution rows and columns that sample the hair box of
+    the parsing map (hair_roi) are visited. Pixels come out in row-major order.
+    """
+    height, width = origin.shape[:2]
+    grid_h, grid_w = parsing_anno.shape[:2]
+    rows = (np.arange(height) * grid_h / height).astype(np.intp)
+    cols = (np.arange(width) * grid_w / width).astype(np.intp)
+
+    mask, box = hair_roi(parsing_anno, label, bottom_fraction, dilation)
+    if box is None:
+        return np.empty((0, 3), dtype=np.uint8)
+    r0, r1, c0, c1 = box
+    # rows/cols never decrease, so each grid range maps to one pixel range
+    y0, y1 = np.searchsorted(rows, r0, "left"), np.searchsorted(rows, r1, "right")
+    x0, x1 = np.searchsorted(cols, c0, "left"), np.searchsorted(cols, c1, "right")
+
+    hair_mask = mask[np.ix_(rows[y0:y1], cols[x0:x1])]
+    return np.ascontiguousarray(origin[y0:y1, x0:x1][hair_mask][:, ::-1], dtype=np.uint8)
+
+
+def hair_crop_box(parsed, padding, label=17):
+    """Pixel box (left, upper, right, lower) around the hair of a parse_images() entry.
+
+    The hair box of the parsing map is scaled to the source frame and grown
+    by `padding` times its width and height on every side, clipped to the
+    frame; the result can go straight to Image.crop. None without hair.
+    """
+    _, origin, parsing, _ = parsed
+    _, box = hair_roi(parsing, label)
+    if box is None:
+        return None
+    height, width = origin.shape[:2]
+    grid_h, grid_w = parsing.shape[:2]
+    r0, r1, c0, c1 = box
+    top, bottom = r0 * height / grid_h, (r1 + 1) * height / grid_h
+    left, right = c0 * width / grid_w, (c1 + 1) * width / grid_w
+    pad_y, pad_x = (bottom - top) * padding, (right - left) * padding
+    return (
+        max(0, int(left - pad_x)), max(0, int(top - pad_y)),
+        min(width, int(np.ceil(right + pad_x))), min(height, int(np.ceil(bottom + pad_y))),
+    )
+
+
 def vis_parsing_maps(im, origin, parsing_anno, stride):
 
-    im = np.array(im)
     vis_parsing_anno = parsing_anno.copy().astype(np.uint8)
     vis_parsing_anno = cv2.resize(vis_parsing_anno, None, fx=stride, fy=stride, interpolation=cv2.INTER_NEAREST)
 
-    hair_pixels = []
+    with stage("mask_extraction"):
+        hair_pixels = extract_hair_pixels(  # 17 = hair
+            origin, vis_parsing_anno,
+            bottom_fraction=Settings.HAIR_ROI_BOTTOM_FRACTION, dilation=Settings.HAIR_ROI_DILATION,
+        )
 
-    for x in range(origin.shape[0]):
-        for y in range(origin.shape[1]):
-            _x = int(x * 512 / origin.shape[0])
-            _y = int(y * 512 / origin.shape[1])
-            if vis_parsing_anno[_x][_y] == 17:  # 17 = hair
-                b, g, r = origin[x, y]
-                hair_pixels.append([r, g, b])  # RGB
-
-    print("hair pixel--------------", len(hair_pixels))
     if len(hair_pixels) == 0 :
         return {
             "status_code": 400,
             "error": "No hair pixels detected. Please upload a clear image with visible hair for processing."
         }
 
-    response = get_dominant_colors_from_hair(hair_pixels, n_clusters=3, min_percentage=3)
-    print("get dominant color--------------", response['dominant_hair_colors'])
+    with stage("clustering"):
+        response = get_dominant_colors_from_hair(hair_pixels, n_clusters=3, min_percentage=3)
     if response['status_code'] == 400:
         return response
 
-    with open("hair_rgb.json", "w") as f:
-        json.dump({"dominant_hair_colors": response['dominant_hair_colors']}, f)
-        return {"status_code": 200}
+    return {"status_code": 200, "dominant_hair_colors": response['dominant_hair_colors']}
 
 
 
@@ -147,7 +208,7 @@ def vis_parsing_maps(im, origin, parsing_anno, stride):
 import cv2
 import numpy as np
 
-def highlight_hair_region(origin, parsing_anno, stride=1, bottom_fraction=0.5):
+def highlight_hair_region(origin, parsing_anno, stride=1, bottom_fraction=0.5, output_path=None):
     # Resize parsing map to original image scale
     vis_parsing_anno = parsing_anno.copy().astype(np.uint8)
     vis_parsing_anno = cv2.resize(vis_parsing_anno, (origin.shape[1], origin.shape[0]), interpolation=cv2.INTER_NEAREST)
@@ -177,27 +238,22 @@ def highlight_hair_region(origin, parsing_anno, stride=1, bottom_fraction=0.5):
     # Blend original and overlay
     highlighted = cv2.addWeighted(origin, 0.7, overlay, 0.3, 0)
     
-    # Save highlighted image
-    cv2.imwrite("highlighted_hair_bottom.png", highlighted)
+    # Save highlighted image (debug only)
+    if output_path:
+        cv2.imwrite(str(output_path), highlighted)
     
     return highlighted
 
 
-def evaluate(cp='model/model.pth', input_path=''):
-    n_classes = 19
+def _prepare(image):
+    """(512x512 model input image, BGR origin, normalised (3, 512, 512) tensor)."""
     # device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
     device = torch.device('cpu')
-    print(f"Using device: {device}")
-    n_classes = 19
-    net = BiSeNet(n_classes=n_classes)
-    net.cpu()
-    save_pth = osp.join('', cp)
-    net.load_state_dict(torch.load(save_pth, map_location=torch.device('cpu')))
-    net.eval()
-
-    # Load image universally
-    pil_img = load_image_any_format(input_path)  # PIL Image (RGB)
-    origin = np.array(pil_img)[:, :, ::-1].copy()  # Convert RGB → BGR for OpenCV
+    # Load image universally (path, bytes or in-memory cutout)
+    pil_img = load_image_any_format(image)  # PIL Image (RGB)
+    # BGR view for OpenCV; only the hair box is ever read at full resolution,
+    # so the frame is not copied again
+    origin = np.asarray(pil_img)[:, :, ::-1]
 
     # Preprocess for model
     to_tensor = transforms.Compose([
@@ -205,46 +261,100 @@ def evaluate(cp='model/model.pth', input_path=''):
         transforms.Normalize((0.485, 0.456, 0.406), (0.229, 0.224, 0.225)),
     ])
     image_resized = pil_img.resize((512, 512))
-    img_tensor = to_tensor(image_resized)
-    img_tensor = torch.unsqueeze(img_tensor, 0).to(device)
-
-    # Run inference
-    with torch.no_grad():
-        out = net(img_tensor)[0]
-        parsing = out.squeeze(0).cpu().numpy().argmax(0)
+    img_tensor = to_tensor(image_resized).to(device)
+    return image_resized, origin, img_tensor
+
+
+def parse_images(images, net=None, with_confidence=False):
+    """Preprocess and parse images, in batches of at most PARSER_MAX_BATCH.
+
+    Returns one (image_resized, origin, parsing, hair_confidence) tuple per
+    image, in order; hair_confidence (see hair_parser.hair_confidence) is
+    None unless `with_confidence`. Mask extraction and clustering have not
+    run yet, so callers can look at the confidence before paying for
+    hair_colors().
+    """
+    with stage("preprocess"):
+        prepared = [_prepare(image) for image in images]
+
+    with stage("parser"):
+        # The parser is loaded once per process by the model registry
+        if net is None:
+            net = get_parser()
+        parsings, confidences = [], []
+        for start in range(0, len(prepared), Settings.PARSER_MAX_BATCH):
+            chunk = prepared[start:start + Settings.PARSER_MAX_BATCH]
+            batch = torch.stack([img_tensor for _, _, img_tensor in chunk])
+            if with_confidence:
+                chunk_parsings, chunk_confidences = parse_batch(net, batch, with_confidence=True)
+                confidences.extend(chunk_confidences)
+            else:
+                chunk_parsings = parse_batch(net, batch)
+                confidences.extend([None] * len(chunk))
+            parsings.extend(chunk_parsings)
+
+    return [(image_resized, origin, parsing, confidence)
+            for (image_resized, origin, _), parsing, confidence in zip(prepared, parsings, confidences)]
+
+
+def hair_colors(parsed):
+    """Hair colour response (mask extraction + clustering) for one parse_images() entry."""
+    image_resized, origin, parsing, confidence = parsed
+    if Settings.DEBUG_IMAGES:
+        highlight_hair_region(np.ascontiguousarray(origin), parsing, stride=1,
+                              output_path=Settings.debug_image_path("highlighted_hair_bottom"))
 
-    # Hair region + color
-    highlight_hair_region(origin, parsing, stride=1)
-    
     response = vis_parsing_maps(image_resized, origin, parsing, stride=1)
+    if confidence is not None:
+        response["hair_confidence"] = confidence
     return response
 
+
+def evaluate(image, net=None, with_confidence=False):
+    """Hair colour response for one image.
+
+    With `with_confidence`, the response also carries the parser's
+    `hair_confidence`; that needs the logits, so the micro-batcher is
+    bypassed.
+    """
+    if net is None and Settings.PARSER_BATCH_WINDOW_MS > 0 and not with_confidence:
+        with stage("preprocess"):
+            image_resized, origin, img_tensor = _prepare(image)
+        # Run inference, batched with concurrent requests
+        with stage("parser"):
+            parsing = get_batcher().parse(img_tensor)
+        return hair_colors((image_resized, origin, parsing, None))
+    return hair_colors(parse_images([image], net, with_confidence)[0])
+
+
+def evaluate_batch(images, net=None, with_confidence=False):
+    """evaluate() for several images with batched BiSeNet forward passes.
+
+    Returns one response per image, in order.
+    """
+    return [hair_colors(parsed) for parsed in parse_images(images, net, with_confidence)]
+
 def detect_shade_color(input_path):
     img = Image.open(input_path).convert("RGB")
-    img_rgb = np.array(img)  # shape (H, W, 3)
-    pixels_array = img_rgb.reshape(-1, 3)  # shape (num_pixels, 3)
-
-    # Convert each pixel's each channel to np.uint8 explicitly (redundant but for safety)
-    pixels= [[np.uint8(ch) for ch in pixel] for pixel in pixels_array]
-   
-    print(len(pixels))
+    pixels = np.asarray(img).reshape(-1, 3)  # (num_pixels, 3) uint8 view, no per-pixel objects
 
     dominant_colors = get_dominant_colors_from_hair(pixels, n_clusters=3, min_percentage=3)
+    # Catalogue entries hold only the colour list, not the status envelope;
+    # colours are plain ints and percentages plain floats, so it is JSON-safe
+    dominant_colors = dominant_colors.get("dominant_hair_colors", [])
 
-    with open("shade_rgb.json", "w") as f:
-        json.dump({"dominant_hair_colors": dominant_colors}, f)
-    with open("shade_rgb.json", "r") as f:
-        shade_rgb = json.load(f)
-    os.remove("shade_rgb.json")  # Clean up temp file
-    
-    return shade_rgb["dominant_hair_colors"]
+    # Store Lab next to RGB so the perceptual metrics skip the conversion
+    for shade_color in dominant_colors:
+        shade_color["lab"] = lab_entry(shade_color["color"])
+    return dominant_colors
 
-        
 
-def detect_hair_color(input_path='files/1.JPG'):
-    response = evaluate(input_path=input_path)
-    print("response----------------", response)
-    return response
+def detect_hair_color(image, with_confidence=False):
+    return evaluate(image, with_confidence=with_confidence)
+
+
+def detect_hair_colors(images, with_confidence=False):
+    return evaluate_batch(images, with_confidence=with_confidence)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,67 @@
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from app.config import Settings
+
+HAIR_LABEL = 17
+
+
+def hair_confidence(logits):
+    """Mean hair probability over the pixels labelled hair, per image.
+
+    `logits` is a (N, 19, h, w) tensor; images without hair pixels get 0.0.
+    """
+    probs = logits.softmax(1)
+    hair = probs.argmax(1) == HAIR_LABEL
+    return [float(p[m].mean()) if m.any() else 0.0 for p, m in zip(probs[:, HAIR_LABEL], hair)]
+
+
+def parse_full(net, batch, with_confidence=False):
+    """19-class argmax of the full-resolution logits, shape (N, H, W)."""
+    with torch.no_grad():
+        out = net(batch)[0]
+    parsing = out.cpu().numpy().argmax(1)
+    if with_confidence:
+        return parsing, hair_confidence(out)
+    return parsing
+
+
+def parse_hair_only(net, batch, with_confidence=False):
+    """Hair-vs-rest decision made at 1/8 resolution, shape (N, H, W).
+
+    Only the hair margin (hair logit minus the best other logit) is
+    upsampled, instead of 19 full-resolution channels. Returns a uint8 map
+    holding HAIR_LABEL for hair and 0 elsewhere, so it can be used wherever
+    a parsing map is expected. The confidence is taken at 1/8 resolution.
+    """
+    if not hasattr(net, "forward_logits8"):
+        # Exported backends only expose the full-resolution output
+        parsing = parse_full(net, batch, with_confidence)
+        if with_confidence:
+            parsing, confidence = parsing
+            return np.where(parsing == HAIR_LABEL, HAIR_LABEL, 0).astype(np.uint8), confidence
+        return np.where(parsing == HAIR_LABEL, HAIR_LABEL, 0).astype(np.uint8)
+
+    with torch.no_grad():
+        logits8 = net.forward_logits8(batch)
+        others = torch.cat([logits8[:, :HAIR_LABEL], logits8[:, HAIR_LABEL + 1:]], dim=1)
+        margin = logits8[:, HAIR_LABEL:HAIR_LABEL + 1] - others.amax(dim=1, keepdim=True)
+        margin = F.interpolate(margin, batch.shape[2:], mode='bilinear', align_corners=True)
+    hair = margin[:, 0].cpu().numpy() > 0
+    if with_confidence:
+        return hair.astype(np.uint8) * HAIR_LABEL, hair_confidence(logits8)
+    return hair.astype(np.uint8) * HAIR_LABEL
+
+
+def parse_batch(net, batch, mode=None, with_confidence=False):
+    """Parsing maps for a (N, 3, 512, 512) batch using Settings.PARSER_MODE.
+
+    With `with_confidence`, returns (maps, per-image hair_confidence).
+    """
+    mode = mode or Settings.PARSER_MODE
+    if mode == "hair":
+        return parse_hair_only(net, batch, with_confidence)
+    if mode == "full":
+        return parse_full(net, batch, with_confidence)
+    raise ValueError(f"Unknown parser mode: {mode!r} (expected 'full' or 'hair')")
@@ -0,0 +1,208 @@
+from app.config import Settings
+from app.services.hair_color_detector import detect_hair_color, detect_hair_colors, hair_colors, hair_crop_box, parse_images
+from app.services.best_shade_matcher import find_best_shade, find_best_shade_single, find_best_shade4
+from app.services.background_remove import remove_background
+from app.services.metrics import collect_stages, stage
+from app.services.shade_store import match_snapshot
+from app.services.upload_guard import decode_image
+
+# Catalogue the API matches against (also part of the result cache key)
+MATCH_CATALOGUE = "single"
+MATCHERS = {"single": find_best_shade_single, "lighting": find_best_shade, "lighting4": find_best_shade4}
+
+NO_HAIR_MESSAGE = "No hair color detected. Please upload a clear image with visible hair."
+
+
+def _background_mode():
+    mode = Settings.BACKGROUND_REMOVAL
+    if mode not in ("always", "never", "auto"):
+        raise ValueError(f"Unknown background removal mode: {mode!r} (expected 'always', 'never' or 'auto')")
+    return mode
+
+
+def _needs_cutout(parsed):
+    """auto mode: fall back to rembg when the parser is unsure on the original.
+
+    `parsed` is a parse_images() entry; images without hair have confidence 0.
+    """
+    return parsed[3] < Settings.BACKGROUND_REMOVAL_MIN_CONFIDENCE
+
+
+def _fallback_source(source, parsed):
+    """auto mode: the part of `source` that goes through rembg and the second parse.
+
+    That is the hair box of the first parse plus BACKGROUND_REMOVAL_CROP_PADDING,
+    so rembg and the parser do not pay for the rest of the frame; the whole
+    frame when the first parse found no hair.
+    """
+    box = hair_crop_box(parsed, Settings.BACKGROUND_REMOVAL_CROP_PADDING)
+    return source if box is None else source.crop(box)
+
+
+def detect_hair(source):
+    """Hair colour response for a decoded upload, per Settings.BACKGROUND_REMOVAL.
+
+    "always" parses the rembg cutout, "never" the original image (the
+    parser's hair class already excludes background), "auto" the original
+    first and the cutout of its hair box only when the hair mask confidence
+    is low. The confidence is checked right after parsing, so
+    full-resolution extraction and clustering only run on the image that
+    is kept.
+    """
+    mode = _background_mode()
+    if mode == "never":
+        return detect_hair_color(source)
+    if mode == "auto":
+        parsed = parse_images([source], with_confidence=True)[0]
+        if not _needs_cutout(parsed):
+            return hair_colors(parsed)
+        source = _fallback_source(source, parsed)
+
+    with stage("background_removal"):
+        cutout = remove_background(source)
+    if Settings.DEBUG_IMAGES:
+        cutout.save(Settings.debug_image_path("remove_bg"))
+    return detect_hair_color(cutout)
+
+
+def detect_hair_batch(sources):
+    """detect_hair() for several decoded uploads, parsed as batches."""
+    mode = _background_mode()
+    if mode == "never":
+        return detect_hair_colors(sources)
+    responses, todo = [None] * len(sources), range(len(sources))
+    if mode == "auto":
+        todo, sources = [], list(sources)
+        for i, parsed in enumerate(parse_images(sources, with_confidence=True)):
+            if _needs_cutout(parsed):
+                todo.append(i)
+                sources[i] = _fallback_source(sources[i], parsed)
+            else:
+                responses[i] = hair_colors(parsed)
+    if todo:
+        with stage("background_removal"):
+            cutouts = [remove_background(sources[i]) for i in todo]
+        for i, response in zip(todo, detect_hair_colors(cutouts)):
+            responses[i] = response
+    return responses
+
+
+def match_colors(user_rgb, top_k=None, metric=None):
+    """(best shade, scores) for dominant colours against MATCH_CATALOGUE.
+
+    Uses the cached, compiled catalogue plus the uploaded product shades
+    (match_snapshot; rebuilt when the JSON file or the shade store changes).
+    """
+    shades = match_snapshot(MATCH_CATALOGUE)
+    return MATCHERS[MATCH_CATALOGUE](user_rgb, shades.compiled, top_k, metric)
+
+
+def fuse_colors(color_lists):
+    """Merge per-image dominant colours into one percentage-weighted list.
+
+    Every image weighs the same: its percentages are divided by the number
+    of images, so the fused list still sums to (at most) 100 and a
+    match_score on it is the mean of the per-image match_scores.
+    """
+    n_images = len(color_lists)
+    return [
+        {**color, "percentage": color["percentage"] / n_images}
+        for colors in color_lists
+        for color in colors
+    ]
+
+
+def match_hair_image(upload_bytes, top_k=None, metric=None):
+    """Run the full CPU-bound match pipeline on raw upload bytes.
+
+    This is what the worker pool executes: background removal, BiSeNet
+    parsing, colour clustering and shade matching. Returns the response
+    body of /hair/match-hair-color; with `top_k`, only the best `top_k`
+    shades are scored in full and returned in all_scores. `metric` picks
+    the colour difference ("rgb" or a Lab ΔE metric, see color_metrics).
+    """
+    # Decode once, at the analysis resolution; every later stage runs on it
+    with stage("decode"):
+        source = decode_image(upload_bytes, max_side=Settings.ANALYSIS_MAX_SIDE)
+
+    # Steps 2-3: remove background (see BACKGROUND_REMOVAL) and detect
+    # hair color
+    detect_response = detect_hair(source)
+    if detect_response['status_code'] == 400:
+        return {
+            "matched_shade": None,
+            "match_percentage": 0.0,
+            "all_scores": None,
+            "message": NO_HAIR_MESSAGE
+        }
+
+    user_rgb = detect_response['dominant_hair_colors']
+
+    # Step 4: find best match against the cached, compiled catalogue
+    with stage("matching"):
+        best, all_scores = match_colors(user_rgb, top_k, metric)
+
+    return {
+        "matched_shade": best,
+        "match_percentage": all_scores[best],
+        "all_scores": all_scores
+    }
+
+
+def match_hair_image_timed(upload_bytes, top_k=None, metric=None):
+    """match_hair_image plus its per-stage timings, as (result, timings dict).
+
+    The timings are plain data so they also come back from process workers.
+    """
+    with collect_stages() as timings:
+        result = match_hair_image(upload_bytes, top_k, metric)
+    return result, timings.as_dict()
+
+
+def match_hair_images(uploads, top_k=None, metric=None):
+    """Match several photos of the same head as one request.
+
+    Every upload is decoded (and cut out, see detect_hair), then all of
+    them go through BiSeNet together (evaluate_batch). The dominant colours of the images
+    with visible hair are fused (fuse_colors) into the combined match;
+    each image is also matched on its own for the per-image scores.
+    """
+    with stage("decode"):
+        sources = [
+            decode_image(data, max_side=Settings.ANALYSIS_MAX_SIDE, name=f"image {i}")
+            for i, data in enumerate(uploads, 1)
+        ]
+
+    responses = detect_hair_batch(sources)
+
+    images, detected = [], []
+    with stage("matching"):
+        for response in responses:
+            if response['status_code'] != 200:
+                images.append({"matched_shade": None, "match_percentage": 0.0, "all_scores": None,
+                               "message": NO_HAIR_MESSAGE})
+                continue
+            user_rgb = response['dominant_hair_colors']
+            best, all_scores = match_colors(user_rgb, top_k, metric)
+            images.append({"matched_shade": best, "match_percentage": all_scores[best],
+                           "all_scores": all_scores, "dominant_hair_colors": user_rgb})
+            detected.append(user_rgb)
+
+        if not detected:
+            return {"matched_shade": None, "match_percentage": 0.0, "all_scores": None,
+                    "message": NO_HAIR_MESSAGE, "images": images}
+        best, all_scores = match_colors(fuse_colors(detected), top_k, metric)
+
+    return {
+        "matched_shade": best,
+        "match_percentage": all_scores[best],
+        "all_scores": all_scores,
+        "images": images,
+    }
+
+
+def match_hair_images_timed(uploads, top_k=None, metric=None):
+    """match_hair_images plus its per-stage timings, as (result, timings dict)."""
+    with collect_stages() as timings:
+        result = match_hair_images(uploads, top_k, metric)
+    return result, timings.as_dict()
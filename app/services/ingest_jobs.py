@@ -0,0 +1,303 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+import psutil
+
+from app.config import Settings
+from app.services.hair_color_detector import detect_shade_color
+from app.services.shade_store import get_shade_store
+
+# Lighting images of one product shade: upload field tag -> catalogue key
+INGEST_IMAGES = {"CloseUp": "closeup", "IndoorLight": "indoor_light", "NaturalLight": "natural_light"}
+
+# Job states; queued and running jobs are resumed after a restart
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+ACTIVE = (QUEUED, RUNNING)
+
+# Identifies this process as a job owner, even if a restarted server gets the same pid
+OWNER = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def image_path(job_dir, tag):
+    return Path(job_dir) / f"shade_{tag}.png"
+
+
+def _owner_alive(owner):
+    """Whether the process that claimed a job is still running on this host."""
+    if owner is None:
+        return False
+    if owner == OWNER:
+        return True
+    pid, _, _ = owner.partition(":")
+    if not pid.isdigit() or int(pid) == os.getpid():
+        # Same pid, different token: an earlier incarnation of this server
+        return False
+    # Not os.kill(pid, 0): on Windows that terminates the process
+    return psutil.pid_exists(int(pid))
+
+
+class IngestJobStore:
+    """Product-ingest jobs in SQLite, so queued work survives a restart.
+
+    Each job keeps the colours of every image already processed, so a
+    resumed job only redoes the images it had not finished.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " shade_name TEXT NOT NULL,"
+                " job_dir TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " owner TEXT,"
+                " images TEXT NOT NULL,"
+                " error TEXT,"
+                " version INTEGER,"
+                " created REAL NOT NULL,"
+                " updated REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def create(self, job_id, shade_name, job_dir, owner):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, shade_name, job_dir, status, owner, images, created, updated)"
+                " VALUES (?, ?, ?, ?, ?, '{}', ?, ?)",
+                (job_id, shade_name, str(job_dir), QUEUED, owner, now, now),
+            )
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["images"] = json.loads(job["images"])
+        return job
+
+    def active_for_shade(self, shade_name):
+        """Id of a queued or running job for this shade name, if any."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE shade_name = ? AND status IN (?, ?)", (shade_name, *ACTIVE)
+            ).fetchone()
+        return row[0] if row else None
+
+    def orphaned(self):
+        """Queued or running jobs whose owning process is gone."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, owner FROM jobs WHERE status IN (?, ?) ORDER BY created", ACTIVE
+            ).fetchall()
+        return [(job_id, owner) for job_id, owner in rows if not _owner_alive(owner)]
+
+    def claim(self, job_id, previous_owner, owner):
+        """Take over a job; False if another process claimed it first.
+
+        The job goes back to queued until one of its images is picked up.
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET owner = ?, status = ?, updated = ?"
+                " WHERE id = ? AND owner IS ? AND status IN (?, ?)",
+                (owner, QUEUED, time.time(), job_id, previous_owner, *ACTIVE),
+            )
+        return cursor.rowcount == 1
+
+    def mark_running(self, job_id):
+        """queued -> running; a job that already finished or failed is left alone."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, updated = ? WHERE id = ? AND status = ?",
+                (RUNNING, time.time(), job_id, QUEUED),
+            )
+
+    def set_status(self, job_id, status, error=None, version=None):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, version = ?, updated = ? WHERE id = ?",
+                (status, error, version, time.time(), job_id),
+            )
+
+    def add_image(self, job_id, tag, colors):
+        """Record one finished image; returns every image finished so far."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                images = json.loads(conn.execute("SELECT images FROM jobs WHERE id = ?", (job_id,)).fetchone()[0])
+                images[tag] = colors
+                conn.execute(
+                    "UPDATE jobs SET images = ?, updated = ? WHERE id = ?",
+                    (json.dumps(images), time.time(), job_id),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return images
+
+
+class IngestQueue:
+    """Background ingest of product shades.
+
+    A job's three lighting images are clustered in parallel on a thread
+    pool (Pillow decoding and KMeans release the GIL); once the last one
+    finishes the shade is inserted into the shade store. Jobs are
+    persisted in an IngestJobStore and resumed by `resume()`.
+    """
+
+    def __init__(self, jobs, shade_store, workers=3):
+        self.jobs = jobs
+        self.shade_store = shade_store
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest-worker")
+        self._lock = threading.Lock()
+        self._remaining = {}  # job id -> images still running
+
+    def submit(self, shade_name, job_dir, job_id):
+        """Queue a job whose images are already saved in `job_dir`."""
+        self.jobs.create(job_id, shade_name, job_dir, OWNER)
+        self._start(job_id)
+        return job_id
+
+    def resume(self):
+        """Pick up jobs left behind by a stopped or crashed server."""
+        resumed = []
+        for job_id, owner in self.jobs.orphaned():
+            if self.jobs.claim(job_id, owner, OWNER):
+                self._start(job_id)
+                resumed.append(job_id)
+        return resumed
+
+    def _start(self, job_id):
+        job = self.jobs.get(job_id)
+        pending = [tag for tag in INGEST_IMAGES if tag not in job["images"]]
+        if not pending:
+            self._executor.submit(self._finish, job_id)
+            return
+        with self._lock:
+            self._remaining[job_id] = len(pending)
+        for tag in pending:
+            future = self._executor.submit(self._run_image, job_id, image_path(job["job_dir"], tag))
+            future.add_done_callback(lambda f, tag=tag: self._image_done(job_id, tag, f))
+
+    def _run_image(self, job_id, path):
+        # The job stays queued while its images wait for a free worker
+        self.jobs.mark_running(job_id)
+        return detect_shade_color(path)
+
+    def _image_done(self, job_id, tag, future):
+        with self._lock:
+            if job_id not in self._remaining:
+                return  # an earlier image already failed the job
+            if future.cancelled():
+                # Shutting down: the job stays active and is resumed later
+                del self._remaining[job_id]
+                return
+            error = future.exception()
+            if error is not None:
+                del self._remaining[job_id]
+            else:
+                self._remaining[job_id] -= 1
+                last = self._remaining[job_id] == 0
+                if last:
+                    del self._remaining[job_id]
+        if error is not None:
+            self._fail(job_id, f"{tag}: {error}")
+            return
+        try:
+            self.jobs.add_image(job_id, tag, future.result())
+        except Exception as e:
+            self._fail(job_id, f"{tag}: {e}")
+            return
+        if last:
+            self._finish(job_id)
+
+    def _finish(self, job_id):
+        job = self.jobs.get(job_id)
+        entry = {INGEST_IMAGES[tag]: colors for tag, colors in job["images"].items()}
+        try:
+            version = self.shade_store.add_shade(job["shade_name"], entry)
+        except KeyError:
+            self._fail(job_id, f"Shade '{job['shade_name']}' already exists.")
+            return
+        except Exception as e:
+            self._fail(job_id, str(e))
+            return
+        self.jobs.set_status(job_id, DONE, version=version)
+        shutil.rmtree(job["job_dir"], ignore_errors=True)
+
+    def _fail(self, job_id, error):
+        job = self.jobs.get(job_id)
+        self.jobs.set_status(job_id, FAILED, error=error)
+        shutil.rmtree(job["job_dir"], ignore_errors=True)
+
+    def shutdown(self):
+        # Unfinished jobs stay queued/running in the store and are resumed
+        # by the next server
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def job_status(job):
+    """Public view of a job row for the status endpoint."""
+    done = [tag for tag in INGEST_IMAGES if tag in job["images"]]
+    status = {
+        "job_id": job["id"],
+        "shade_name": job["shade_name"],
+        "status": job["status"],
+        "progress": {
+            "done": len(done),
+            "total": len(INGEST_IMAGES),
+            "images": {INGEST_IMAGES[tag]: tag in job["images"] for tag in INGEST_IMAGES},
+        },
+    }
+    if job["status"] == DONE:
+        status["data"] = {
+            job["shade_name"]: {INGEST_IMAGES[tag]: job["images"][tag] for tag in done}
+        }
+        status["catalogue_version"] = job["version"]
+    elif job["status"] == FAILED:
+        status["error"] = job["error"]
+    return status
+
+
+_lock = threading.Lock()
+_queue = None
+
+
+def get_ingest_queue():
+    """Process-wide ingest queue backed by INGEST_JOB_DB."""
+    global _queue
+    with _lock:
+        if _queue is None:
+            Settings.INGEST_DIR.mkdir(parents=True, exist_ok=True)
+            _queue = IngestQueue(IngestJobStore(Settings.INGEST_JOB_DB), get_shade_store(), Settings.INGEST_WORKERS)
+        return _queue
+
+
+def shutdown_ingest_queue():
+    global _queue
+    with _lock:
+        if _queue is not None:
+            _queue.shutdown()
+            _queue = None
@@ -1,7 +1,4 @@
-import os
-import json
 import numpy as np
-import cv2
 from PIL import Image
 from pathlib import Path
 from sklearn.cluster import KMeans
@@ -80,20 +77,10 @@ def build_reference_shade(image_path: Path):
 
 
 def main():
-    shade_signatures = {}
-
-    for image_file in DATA_DIR.iterdir():
-        if image_file.is_file() and image_file.suffix.lower() in [".jpg", ".png", ".jpeg"]:
-            shades_data = build_reference_shade(image_file)
-            shade_signatures.update(shades_data)
-
-    # ✅ Save output
-    out_dir = Path("app/shade")
-    out_dir.mkdir(parents=True, exist_ok=True)
-    with open(out_dir / "reference_shades_new.json", "w") as f:
-        json.dump(shade_signatures, f, indent=2)
-
-    print(f"[DONE] Saved {len(shade_signatures)} shades → app/shade/reference_shades_new.json")
+    # Parallel, incremental build (see app/catalogue_builder.py)
+    from app.catalogue_builder import build_catalogue
+    summary = build_catalogue("single", DATA_DIR, "app/shade/reference_shades_new.json")
+    print(f"[DONE] Saved {summary['shades']} shades → app/shade/reference_shades_new.json")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,187 @@
+import contextvars
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import psutil
+    _process = psutil.Process()
+except ImportError:  # RSS samples are skipped without psutil
+    _process = None
+
+try:
+    import resource
+except ImportError:  # Windows: the peak comes from psutil's peak_wset
+    resource = None
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+MEMORY_BUCKETS = tuple(mb * 1024 * 1024 for mb in (256, 512, 1024, 1536, 2048, 3072, 4096, 8192))
+
+
+def _rss_bytes():
+    return _process.memory_info().rss if _process is not None else None
+
+
+def _peak_rss_bytes():
+    """Peak RSS of this process, or None where neither source is available."""
+    if _process is not None:
+        peak = getattr(_process.memory_info(), "peak_wset", None)  # Windows only
+        if peak is not None:
+            return peak
+    if resource is not None:
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss if sys.platform == "darwin" else maxrss * 1024  # bytes on macOS, KiB elsewhere
+    return None
+
+
+class StageTimings:
+    """Durations and RSS samples of the stages of one request.
+
+    Stages of the match pipeline: decode, background_removal, preprocess,
+    parser, mask_extraction, clustering, matching.
+    """
+
+    def __init__(self):
+        self.stages = []  # (name, seconds)
+        self.peak_rss = None
+
+    def add(self, name, seconds, rss=None):
+        self.stages.append((name, seconds))
+        if rss is not None and (self.peak_rss is None or rss > self.peak_rss):
+            self.peak_rss = rss
+
+    def as_dict(self):
+        return {"stages": self.stages, "peak_rss": self.peak_rss}
+
+
+_current = contextvars.ContextVar("stage_timings", default=None)
+
+
+@contextmanager
+def collect_stages():
+    """Collect every `stage()` run in this thread/context into a StageTimings."""
+    timings = StageTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def stage(name):
+    """Time a pipeline stage; a no-op outside collect_stages()."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start, _rss_bytes())
+
+
+def server_timing(timings, extra=()):
+    """Server-Timing header value: `stage;dur=<ms>` entries."""
+    parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings]
+    return ", ".join(parts + list(extra))
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram with one optional label."""
+
+    def __init__(self, name, help_text, buckets, label=None):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.label = label
+        self._lock = threading.Lock()
+        self._series = {}  # label value -> [bucket counts..., sum, count]
+
+    def observe(self, value, label_value=None):
+        with self._lock:
+            series = self._series.setdefault(label_value, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_value, series in sorted(self._series.items(), key=lambda x: str(x[0])):
+                base = [(self.label, label_value)] if self.label else []
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_labels(base + [('le', repr(float(bound)))])} {count}")
+                lines.append(f"{self.name}_bucket{_labels(base + [('le', '+Inf')])} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(base)} {series[-2]}")
+                lines.append(f"{self.name}_count{_labels(base)} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, label=None):
+        self.name = name
+        self.help = help_text
+        self.label = label
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, label_value=None, amount=1):
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_value, value in sorted(self._values.items(), key=lambda x: str(x[0])):
+                base = [(self.label, label_value)] if self.label else []
+                lines.append(f"{self.name}{_labels(base)} {value}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "hair_stage_duration_seconds", "Duration of each match pipeline stage.", DURATION_BUCKETS, label="stage")
+REQUEST_SECONDS = Histogram(
+    "hair_request_duration_seconds", "End-to-end duration of match requests.", DURATION_BUCKETS, label="endpoint")
+REQUEST_PEAK_RSS = Histogram(
+    "hair_request_peak_rss_bytes", "Largest RSS sampled across the stages of one request.", MEMORY_BUCKETS)
+REQUESTS = Counter("hair_requests_total", "Match requests by outcome.", label="outcome")
+
+
+def record_request(seconds, timings=None, outcome="ok", endpoint="match-hair-color"):
+    """Feed one request's timings (a StageTimings.as_dict()) into the histograms."""
+    REQUEST_SECONDS.observe(seconds, endpoint)
+    REQUESTS.inc(outcome)
+    if timings is None:
+        return
+    for name, stage_seconds in timings["stages"]:
+        STAGE_SECONDS.observe(stage_seconds, name)
+    if timings["peak_rss"] is not None:
+        REQUEST_PEAK_RSS.observe(timings["peak_rss"])
+
+
+def render_metrics(extra=()):
+    """Prometheus text exposition of the histograms plus (name, type, help, value) samples."""
+    lines = []
+    for metric in (STAGE_SECONDS, REQUEST_SECONDS, REQUEST_PEAK_RSS, REQUESTS):
+        lines.extend(metric.render())
+    for name, kind, help_text, value in extra:
+        lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"])
+    peak = _peak_rss_bytes()
+    if peak is not None:
+        lines.extend([
+            "# HELP process_peak_rss_bytes Peak resident set size of this process.",
+            "# TYPE process_peak_rss_bytes gauge",
+            f"process_peak_rss_bytes {peak}",
+        ])
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,88 @@
+import threading
+
+import onnxruntime as ort
+import torch
+
+from app.config import Settings
+from app.model import BiSeNet
+
+N_CLASSES = 19
+
+_lock = threading.Lock()
+_parser = None
+
+
+class OnnxParser:
+    """BiSeNet exported by app.model_export, run through ONNX Runtime.
+
+    Callable like the torch module: takes a (N, 3, 512, 512) tensor and
+    returns a one-element tuple with the (N, 19, 512, 512) logits.
+    """
+
+    def __init__(self, path):
+        sess_opts = ort.SessionOptions()
+        sess_opts.intra_op_num_threads = Settings.ORT_INTRA_OP_THREADS
+        sess_opts.inter_op_num_threads = Settings.ORT_INTER_OP_THREADS
+        self.session = ort.InferenceSession(str(path), sess_options=sess_opts,
+                                            providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, x):
+        logits = self.session.run(None, {self.input_name: x.cpu().numpy()})[0]
+        return (torch.from_numpy(logits),)
+
+
+def _build_parser(model_path, backend):
+    """Build the BiSeNet face parser, load its weights and warm it up."""
+    device = torch.device('cpu')
+    if backend == "onnx":
+        net = OnnxParser(model_path)
+    elif backend == "torch":
+        net = BiSeNet(n_classes=N_CLASSES, inference=True)
+        net.load_state_dict(torch.load(str(model_path), map_location=device))
+        net.to(device)
+        net.eval()
+    else:
+        raise ValueError(f"Unknown parser backend: {backend!r} (expected 'torch' or 'onnx')")
+
+    # One dummy forward pass so the first real request does not pay for
+    # lazy allocator / kernel initialisation.
+    with torch.no_grad():
+        net(torch.zeros(1, 3, 512, 512, device=device))
+    return net
+
+
+def _default_path(backend):
+    return Settings.PARSER_ONNX_PATH if backend == "onnx" else Settings.MODEL_PATH
+
+
+def load_parser(model_path=None, backend=None):
+    """Load the parser once per process and return the shared instance."""
+    global _parser
+    backend = backend or Settings.PARSER_BACKEND
+    with _lock:
+        if _parser is None:
+            _parser = _build_parser(model_path or _default_path(backend), backend)
+        return _parser
+
+
+def get_parser():
+    """Return the resident eval-mode parser, loading it on first use."""
+    net = _parser
+    if net is None:
+        net = load_parser()
+    return net
+
+
+def reload_parser(model_path=None, backend=None):
+    """Rebuild the parser (e.g. after model.pth changed) and swap it in.
+
+    The new network is built outside the lock so requests keep using the
+    old instance until the replacement is ready.
+    """
+    global _parser
+    backend = backend or Settings.PARSER_BACKEND
+    net = _build_parser(model_path or _default_path(backend), backend)
+    with _lock:
+        _parser = net
+    return net
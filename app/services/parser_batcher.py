@@ -0,0 +1,83 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import torch
+
+from app.config import Settings
+from app.services.model_registry import get_parser
+from app.services.hair_parser import parse_batch
+
+
+class ParserBatcher:
+    """Dynamic micro-batcher for BiSeNet forward passes.
+
+    Callers hand in a single (3, 512, 512) tensor and block until its
+    parsing map is ready. A background thread waits up to `window_ms` after
+    the first request for more to arrive (at most `max_batch`), runs one
+    batched forward pass and routes each argmax map back to its caller.
+    """
+
+    def __init__(self, window_ms=10, max_batch=8):
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name="parser-batcher", daemon=True)
+        self._thread.start()
+
+    def parse(self, img_tensor):
+        """Return the (512, 512) parsing map for one normalised image tensor."""
+        future = Future()
+        self._queue.put((img_tensor, future))
+        return future.result()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                # Shutdown requested: finish this batch, then stop
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _loop(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            try:
+                parsing = parse_batch(get_parser(), torch.stack([tensor for tensor, _ in batch]))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for i, (_, future) in enumerate(batch):
+                future.set_result(parsing[i])
+
+
+_lock = threading.Lock()
+_batcher = None
+
+
+def get_batcher():
+    """Return the process-wide batcher configured from Settings."""
+    global _batcher
+    with _lock:
+        if _batcher is None:
+            _batcher = ParserBatcher(Settings.PARSER_BATCH_WINDOW_MS, Settings.PARSER_MAX_BATCH)
+        return _batcher
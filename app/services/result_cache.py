@@ -0,0 +1,161 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from app.config import Settings
+
+
+def result_key(upload_bytes, catalogue_version, **params):
+    """Cache key: upload content hash + catalogue version + matcher settings.
+
+    `params` holds the per-request options; the process-wide settings that
+    change the result are folded in here so a config change never serves
+    stale matches.
+    """
+    settings = {
+        "analysis_max_side": Settings.ANALYSIS_MAX_SIDE,
+        "model_path": str(Settings.MODEL_PATH),
+        "parser_onnx_path": str(Settings.PARSER_ONNX_PATH),
+        "parser_backend": Settings.PARSER_BACKEND,
+        "parser_mode": Settings.PARSER_MODE,
+        "rembg_model": Settings.REMBG_MODEL,
+        "background_removal": Settings.BACKGROUND_REMOVAL,
+        "background_removal_min_confidence": Settings.BACKGROUND_REMOVAL_MIN_CONFIDENCE,
+        "background_removal_crop_padding": Settings.BACKGROUND_REMOVAL_CROP_PADDING,
+        "quantizer": Settings.QUANTIZER_BACKEND,
+        "quantizer_sample_size": Settings.QUANTIZER_SAMPLE_SIZE,
+        "hair_roi_bottom_fraction": Settings.HAIR_ROI_BOTTOM_FRACTION,
+        "hair_roi_dilation": Settings.HAIR_ROI_DILATION,
+        "match_metric": Settings.MATCH_METRIC,
+        "deltae_scale": Settings.DELTAE_SCALE,
+        "shade_index": Settings.SHADE_INDEX,
+    }
+    digest = hashlib.sha256(upload_bytes).hexdigest()
+    config = json.dumps({"settings": settings, "params": params}, sort_keys=True)
+    return f"{digest}:{catalogue_version}:{hashlib.sha256(config.encode()).hexdigest()[:16]}"
+
+
+class SqliteTier:
+    """Results shared by every worker process through one SQLite file.
+
+    Expired rows are pruned at most once every PRUNE_INTERVAL seconds.
+    """
+
+    PRUNE_INTERVAL = 60
+
+    def __init__(self, path, ttl):
+        self.path = str(path)
+        self.ttl = ttl
+        self._last_prune = 0.0
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT, created REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS results_created ON results (created)")
+
+    @contextmanager
+    def _connect(self):
+        # Autocommit: each statement is its own transaction
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, created FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return row[0], row[1]
+
+    def put(self, key, value, created):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?)", (key, value, created))
+            if created - self._last_prune >= self.PRUNE_INTERVAL:
+                self._last_prune = created
+                conn.execute("DELETE FROM results WHERE created < ?", (created - self.ttl,))
+
+
+class ResultCache:
+    """LRU of match results with TTL, optionally backed by SQLite.
+
+    Values are stored as JSON text so callers always get a fresh copy.
+    Lookups fall through to the SQLite tier and promote hits into the LRU.
+    """
+
+    def __init__(self, max_entries=256, ttl=3600, db_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (json text, created)
+        self._disk = SqliteTier(db_path, ttl) if db_path else None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None and self._disk is not None:
+            entry = self._disk.get(key)
+            if entry is not None:
+                self._remember(key, *entry)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(entry[0])
+
+    def _remember(self, key, value, created):
+        with self._lock:
+            self._entries[key] = (value, created)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def put(self, key, result):
+        value = json.dumps(result)
+        created = time.time()
+        self._remember(key, value, created)
+        if self._disk is not None:
+            self._disk.put(key, value, created)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "sqlite": self._disk.path if self._disk is not None else None,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_lock = threading.Lock()
+_cache = None
+
+
+def get_result_cache():
+    """Process-wide ResultCache, or None when RESULT_CACHE_SIZE is 0."""
+    global _cache
+    if Settings.RESULT_CACHE_SIZE <= 0:
+        return None
+    with _lock:
+        if _cache is None:
+            _cache = ResultCache(
+                max_entries=Settings.RESULT_CACHE_SIZE,
+                ttl=Settings.RESULT_CACHE_TTL_SECONDS,
+                db_path=Settings.RESULT_CACHE_DB or None,
+            )
+        return _cache
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from app.config import Settings
+from app.services.best_shade_matcher import LIGHTING4_KEYS, LIGHTING_KEYS, compile_shades
+
+
+def atomic_write_json(path, data, indent=2):
+    """Write JSON next to `path` and rename it into place.
+
+    Readers see either the old or the new file, never a partial one.
+    """
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class CatalogueSnapshot:
+    """Immutable view of a catalogue: raw JSON dict, compiled arrays, version."""
+
+    def __init__(self, raw, compiled, version):
+        self.raw = raw
+        self.compiled = compiled
+        self.version = version
+
+
+class ShadeCatalogue:
+    """A shade catalogue JSON file, parsed and compiled once.
+
+    `snapshot()` stats the file on every call and reloads it when its
+    mtime/size changed and the content hash differs. The files are only
+    written by the catalogue builder; ingested product shades live in the
+    ShadeStore.
+    """
+
+    def __init__(self, path, light_keys=None):
+        self.path = Path(path)
+        self.light_keys = light_keys
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._snapshot = None
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _build(self, raw, digest):
+        return CatalogueSnapshot(raw, compile_shades(raw, self.light_keys), digest[:16])
+
+    def _reload(self, stamp):
+        if stamp is None:
+            raise FileNotFoundError(f"Shade data file not found at: {self.path}")
+        content = self.path.read_bytes()
+        digest = hashlib.sha256(content).hexdigest()
+        if self._snapshot is None or self._snapshot.version != digest[:16]:
+            self._snapshot = self._build(json.loads(content), digest)
+        self._stamp = stamp
+
+    def snapshot(self):
+        stamp = self._stat()
+        if stamp is None or stamp != self._stamp:
+            with self._lock:
+                if stamp is None or stamp != self._stamp:
+                    self._reload(stamp)
+        return self._snapshot
+
+
+CATALOGUES = {
+    "single": (Settings.N_SHADE_PATH, None),
+    "lighting": (Settings.SHADE_PATH, LIGHTING_KEYS),
+    "lighting4": (Settings.N4_SHADE_PATH, LIGHTING4_KEYS),
+}
+
+_registry_lock = threading.Lock()
+_catalogues = {}
+
+
+def get_catalogue(name):
+    """Return the process-wide ShadeCatalogue registered under `name`."""
+    with _registry_lock:
+        if name not in _catalogues:
+            path, light_keys = CATALOGUES[name]
+            _catalogues[name] = ShadeCatalogue(path, light_keys)
+        return _catalogues[name]
@@ -0,0 +1,57 @@
+import numpy as np
+from sklearn.neighbors import BallTree, KDTree
+
+from app.config import Settings
+from app.services.color_metrics import rgb_to_lab
+
+INDEX_TYPES = {"kdtree": KDTree, "balltree": BallTree}
+
+
+def get_index(compiled, kind=None, space="rgb"):
+    """Spatial index over a CompiledShades' colour rows, built once and cached on it.
+
+    `space` is "rgb" (the `colors` rows) or "lab" (the `lab` rows).
+    """
+    kind = kind or Settings.SHADE_INDEX
+    if (kind, space) not in compiled.indexes:
+        if kind not in INDEX_TYPES:
+            raise ValueError(f"Unknown shade index: {kind!r} (expected one of {sorted(INDEX_TYPES)})")
+        points = compiled.lab if space == "lab" else compiled.colors.astype(np.float64)
+        compiled.indexes[(kind, space)] = INDEX_TYPES[kind](points)
+    return compiled.indexes[(kind, space)]
+
+
+def _query_points(user_colors, space):
+    points = np.array([uc["color"] for uc in user_colors], dtype=np.float64).reshape(-1, 3)
+    return rgb_to_lab(points) if space == "lab" else points
+
+
+def shades_within(user_colors, compiled, radius, space="rgb"):
+    """Shade indices with at least one colour closer than `radius` to a user colour."""
+    if len(compiled.colors) == 0 or not user_colors:
+        return np.zeros(0, dtype=np.intp)
+    rows = get_index(compiled, space=space).query_radius(_query_points(user_colors, space), r=radius)
+    return np.unique(compiled.shade_idx[np.concatenate(rows).astype(np.intp)])
+
+
+def nearest_shades(user_colors, compiled, top_k, oversample=None, space="rgb"):
+    """Shade indices owning the colours nearest to any user colour.
+
+    Each user colour fetches its `top_k * oversample * rows-per-shade`
+    nearest reference colours. This is a heuristic pre-selection: scores
+    that average over every colour pair can still rank a shade outside the
+    candidates higher. Falls back to every shade when fewer than top_k
+    candidates are found.
+    """
+    oversample = oversample or Settings.SHADE_INDEX_OVERSAMPLE
+    n_rows = len(compiled.colors)
+    if n_rows == 0 or not user_colors:
+        return np.arange(len(compiled))
+
+    rows_per_shade = max(1, int(np.ceil(n_rows / len(compiled))))
+    k = min(n_rows, top_k * oversample * rows_per_shade)
+    _, rows = get_index(compiled, space=space).query(_query_points(user_colors, space), k=k)
+    candidates = np.unique(compiled.shade_idx[rows.ravel()])
+    if len(candidates) < top_k:
+        return np.arange(len(compiled))
+    return candidates
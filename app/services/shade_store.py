@@ -0,0 +1,169 @@
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from app.config import Settings
+from app.services.best_shade_matcher import LIGHTING_KEYS, compile_shades
+from app.services.shade_catalogue import CATALOGUES, CatalogueSnapshot, get_catalogue
+
+
+class ShadeStore:
+    """Append-only shade catalogue in SQLite (WAL mode).
+
+    Every shade is one row; the UNIQUE name constraint makes the duplicate
+    check and the insert one transaction, so concurrent uploads from any
+    number of workers never lose each other's writes. Row ids only grow, so
+    MAX(id) is the catalogue version: the snapshot at version v is every row
+    with id <= v. `snapshot()` costs one indexed query when nothing changed
+    and otherwise reads only the rows added since the last one.
+    """
+
+    def __init__(self, path, light_keys=LIGHTING_KEYS, legacy_json=None):
+        self.path = Path(path)
+        self.light_keys = light_keys
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._version = 0
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS shades ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " name TEXT NOT NULL UNIQUE,"
+                " entry TEXT NOT NULL,"
+                " created REAL NOT NULL)"
+            )
+        if legacy_json is not None:
+            self._import_json(legacy_json)
+
+    @contextmanager
+    def _connect(self):
+        # Autocommit: each statement is its own transaction unless BEGIN is used
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _import_json(self, path):
+        """One-off migration of a JSON catalogue into an empty store."""
+        path = Path(path)
+        if not path.exists():
+            return
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("SELECT 1 FROM shades LIMIT 1").fetchone() is None:
+                    with open(path) as f:
+                        raw = json.load(f)
+                    now = time.time()
+                    conn.executemany(
+                        "INSERT INTO shades (name, entry, created) VALUES (?, ?, ?)",
+                        [(name, json.dumps(entry), now) for name, entry in raw.items()],
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def version(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COALESCE(MAX(id), 0) FROM shades").fetchone()[0]
+
+    def exists(self, shade_name):
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM shades WHERE name = ?", (shade_name,)).fetchone() is not None
+
+    def add_shade(self, shade_name, entry):
+        """Insert one shade and return the new catalogue version.
+
+        Raises KeyError if the shade already exists.
+        """
+        # Compile first so a malformed entry never reaches the store
+        compile_shades({shade_name: entry}, self.light_keys)
+        with self._connect() as conn:
+            try:
+                cursor = conn.execute(
+                    "INSERT INTO shades (name, entry, created) VALUES (?, ?, ?)",
+                    (shade_name, json.dumps(entry), time.time()),
+                )
+            except sqlite3.IntegrityError:
+                raise KeyError(shade_name)
+            return cursor.lastrowid
+
+    def snapshot(self):
+        version = self.version()
+        if self._snapshot is None or version != self._version:
+            with self._lock:
+                if self._snapshot is None or version != self._version:
+                    self._refresh(version)
+        return self._snapshot
+
+    def _refresh(self, version):
+        raw = dict(self._snapshot.raw) if self._snapshot is not None else {}
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT name, entry FROM shades WHERE id > ? AND id <= ? ORDER BY id",
+                (self._version, version),
+            ).fetchall()
+        for name, entry in rows:
+            raw[name] = json.loads(entry)
+        self._snapshot = CatalogueSnapshot(raw, compile_shades(raw, self.light_keys), str(version))
+        self._version = version
+
+
+_lock = threading.Lock()
+_store = None
+
+
+def get_shade_store():
+    """Process-wide store for /product/upload-product, seeded from the old JSON file."""
+    global _store
+    with _lock:
+        if _store is None:
+            _store = ShadeStore(Settings.PRODUCT_SHADE_DB, LIGHTING_KEYS, legacy_json=Settings.PRODUCT_SHADE_PATH)
+        return _store
+
+
+def entry_for_layout(entry, light_keys):
+    """A product shade entry ({lighting: [colours]}) in a catalogue's layout.
+
+    Single-signature catalogues get every lighting's colours in one list,
+    each lighting weighing the same (percentages divided by the number of
+    lightings), like the batch endpoint's fused colours.
+    """
+    if light_keys is not None:
+        return entry
+    lights = [entry[key] for key in LIGHTING_KEYS if key in entry]
+    return [{**color, "percentage": color["percentage"] / len(lights)} for colors in lights for color in colors]
+
+
+_match_lock = threading.Lock()
+_match_snapshots = {}
+
+
+def match_snapshot(name):
+    """Bundled catalogue `name` plus every product shade, as one CatalogueSnapshot.
+
+    Bundled shades win on a name clash. The version combines both sources,
+    so the result cache sees new product shades; the merged catalogue is
+    recompiled only when either side changed.
+    """
+    bundled = get_catalogue(name).snapshot()
+    products = get_shade_store().snapshot()
+    version = f"{bundled.version}+{products.version}"
+    with _match_lock:
+        cached = _match_snapshots.get(name)
+        if cached is not None and cached.version == version:
+            return cached
+        light_keys = CATALOGUES[name][1]
+        raw = dict(bundled.raw)
+        for shade_name, entry in products.raw.items():
+            if shade_name not in raw:
+                raw[shade_name] = entry_for_layout(entry, light_keys)
+        snapshot = CatalogueSnapshot(raw, compile_shades(raw, light_keys), version)
+        _match_snapshots[name] = snapshot
+        return snapshot
@@ -0,0 +1,95 @@
+import io
+
+from PIL import Image, UnidentifiedImageError
+from pillow_heif import register_heif_opener
+
+from app.config import Settings
+from app.services.any_formate import load_image_any_format
+
+# HEIC/HEIF headers are sniffed too
+register_heif_opener()
+
+CHUNK_SIZE = 1 << 20
+
+
+class UploadTooLarge(Exception):
+    """Upload exceeds the byte or pixel limit (HTTP 413)."""
+
+
+class UnsupportedImage(Exception):
+    """Upload is not an image Pillow can decode (HTTP 415)."""
+
+
+def max_upload_bytes():
+    return Settings.UPLOAD_MAX_MB * 1024 * 1024
+
+
+def max_request_bytes():
+    return Settings.UPLOAD_MAX_REQUEST_MB * 1024 * 1024
+
+
+async def read_upload(file, max_bytes=None):
+    """Read an UploadFile in chunks, giving up as soon as it passes max_bytes."""
+    max_bytes = max_bytes or max_upload_bytes()
+    chunks, size = [], 0
+    while True:
+        chunk = await file.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLarge(f"{file.filename or 'upload'} is larger than {max_bytes // (1024 * 1024)} MB")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def save_upload(file, path, max_bytes=None):
+    """Stream an UploadFile to `path` in chunks, with the same size limit."""
+    max_bytes = max_bytes or max_upload_bytes()
+    size = 0
+    with open(path, "wb") as f:
+        while True:
+            chunk = await file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(f"{file.filename or 'upload'} is larger than {max_bytes // (1024 * 1024)} MB")
+            f.write(chunk)
+    return path
+
+
+def sniff_image(source, name="upload"):
+    """(format, (width, height)) read from the image header only.
+
+    `source` is raw bytes or a path. Image.open is lazy, so no pixel data is
+    decoded; oversized dimensions raise UploadTooLarge and anything Pillow
+    cannot identify raises UnsupportedImage.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    try:
+        with Image.open(source) as img:
+            fmt, size = img.format, img.size
+    except Image.DecompressionBombError as e:
+        raise UploadTooLarge(f"{name}: {e}") from e
+    except (UnidentifiedImageError, OSError, SyntaxError) as e:
+        raise UnsupportedImage(f"{name} is not a supported image") from e
+    if size[0] * size[1] > Settings.UPLOAD_MAX_PIXELS:
+        raise UploadTooLarge(f"{name} is {size[0]}x{size[1]} pixels, more than {Settings.UPLOAD_MAX_PIXELS}")
+    return fmt, size
+
+
+def decode_image(data, max_side=None, name="upload"):
+    """Decode an upload that passed sniff_image (see load_image_any_format).
+
+    The sniff only reads the header, so a truncated or corrupt body is
+    first noticed here; it raises UnsupportedImage rather than a bare
+    Pillow error.
+    """
+    try:
+        return load_image_any_format(data, max_side=max_side)
+    except Image.DecompressionBombError as e:
+        raise UploadTooLarge(f"{name}: {e}") from e
+    except (OSError, ValueError, SyntaxError) as e:
+        raise UnsupportedImage(f"{name} could not be decoded: {e}") from e
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from app.config import Settings
+
+
+class PoolSaturated(Exception):
+    """Raised when every worker is busy and the wait queue is full."""
+
+
+def _init_process_worker():
+    # Each worker process needs its own resident models
+    from app.services.model_registry import load_parser
+    from app.services.background_remove import load_session
+    load_parser()
+    if Settings.BACKGROUND_REMOVAL != "never":
+        load_session()
+
+
+class WorkerPool:
+    """Bounded executor for the CPU-heavy match pipeline.
+
+    At most `workers + queue_size` jobs are admitted at once; beyond that
+    `run` raises PoolSaturated right away instead of queueing without limit.
+    A job that does the work of several requests (a batch) reserves that
+    many slots.
+    """
+
+    def __init__(self, mode="thread", workers=2, queue_size=8):
+        if mode == "process":
+            self._executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_process_worker)
+        elif mode == "thread":
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hair-worker")
+        else:
+            raise ValueError(f"Unknown worker mode: {mode!r} (expected 'thread' or 'process')")
+        self.mode = mode
+        self.workers = workers
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._pending = 0  # admitted slots
+        self._jobs = 0  # admitted tasks; a batch is one task holding several slots
+
+    @property
+    def capacity(self):
+        return self.workers + self.queue_size
+
+    def _release(self, slots):
+        with self._lock:
+            self._pending -= slots
+            self._jobs -= 1
+
+    async def run(self, fn, *args, slots=1):
+        """Run fn(*args) on the pool without blocking the event loop.
+
+        The job counts as `slots` admitted jobs until it finishes.
+        """
+        with self._lock:
+            if self._pending + slots > self.capacity:
+                raise PoolSaturated()
+            self._pending += slots
+            self._jobs += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._release(slots)
+            raise
+        # Released when the job really finishes, even if the client went away
+        future.add_done_callback(lambda _future: self._release(slots))
+        return await asyncio.wrap_future(future)
+
+    def stats(self):
+        """Pool occupancy. `in_flight`/`queued` count tasks (each runs on one
+        worker); `reserved_slots` counts admission slots, which is what
+        PoolSaturated is decided on."""
+        with self._lock:
+            reserved, jobs = self._pending, self._jobs
+        in_flight = min(jobs, self.workers)
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "capacity": self.capacity,
+            "reserved_slots": reserved,
+            "in_flight": in_flight,
+            "queued": jobs - in_flight,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool = None
+
+
+def get_pool():
+    """Return the process-wide worker pool, creating it from Settings."""
+    global _pool
+    if _pool is None:
+        _pool = WorkerPool(Settings.WORKER_MODE, Settings.WORKER_COUNT, Settings.WORKER_QUEUE_SIZE)
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
@@ -0,0 +1,56 @@
+"""Speed and colour drift of the dominant-colour backends.
+
+Runs every backend of app.services.color_quantizer through
+get_dominant_colors_from_hair on the pixels of sample images from data/,
+and compares against the exact "kmeans" backend (today's behaviour).
+Drift is the percentage-weighted RGB distance from each exact colour to
+the nearest colour returned by the backend.
+
+    python -m benchmarks.bench_color_quantizer --images 6 --max-side 1500
+"""
+import argparse
+import time
+
+import numpy as np
+from PIL import Image
+
+from app.config import Settings
+from app.services.color_quantizer import BACKENDS
+from app.services.hair_color_detector import get_dominant_colors_from_hair
+
+
+def drift(reference, candidate):
+    ref = np.array([c["color"] for c in reference], dtype=float)
+    cand = np.array([c["color"] for c in candidate], dtype=float)
+    weights = np.array([c["percentage"] for c in reference])
+    nearest = np.linalg.norm(ref[:, None, :] - cand[None, :, :], axis=2).min(axis=1)
+    return float((nearest * weights).sum() / weights.sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=6)
+    parser.add_argument("--max-side", type=int, default=0, help="downscale images first (0 = full size)")
+    args = parser.parse_args()
+
+    pixel_sets = []
+    for path in sorted(Settings.DATA_DIR.glob("*/*.jpg"))[:args.images]:
+        img = Image.open(path).convert("RGB")
+        if args.max_side:
+            img.thumbnail((args.max_side, args.max_side))
+        pixel_sets.append(np.asarray(img).reshape(-1, 3))
+    print(f"{len(pixel_sets)} images, {int(np.mean([len(p) for p in pixel_sets]))} pixels on average")
+
+    results = {}
+    print(f"{'backend':<12}{'ms/image':>10}{'drift (RGB)':>13}{'max drift':>11}")
+    for backend in BACKENDS:
+        start = time.perf_counter()
+        results[backend] = [get_dominant_colors_from_hair(p, backend=backend)["dominant_hair_colors"]
+                            for p in pixel_sets]
+        elapsed = (time.perf_counter() - start) / len(pixel_sets)
+        drifts = [drift(ref, cand) for ref, cand in zip(results["kmeans"], results[backend])]
+        print(f"{backend:<12}{elapsed * 1000:>10.1f}{np.mean(drifts):>13.2f}{np.max(drifts):>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
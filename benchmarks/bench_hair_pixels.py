@@ -0,0 +1,116 @@
+"""Parity check and timing for hair-pixel extraction.
+
+Runs the original per-pixel loop from vis_parsing_maps next to
+extract_hair_pixels on random parsing maps and awkward image sizes, checks
+that both return exactly the same pixels in the same order, then times them.
+The hair-box (ROI) path is also checked against the full-frame mask, with
+and without bottom_fraction/dilation, and timed on a selfie-like map.
+
+    python -m benchmarks.bench_hair_pixels --size 3000x4000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.hair_color_detector import extract_hair_pixels, hair_roi
+
+
+def legacy_hair_pixels(origin, vis_parsing_anno):
+    hair_pixels = []
+    for x in range(origin.shape[0]):
+        for y in range(origin.shape[1]):
+            _x = int(x * 512 / origin.shape[0])
+            _y = int(y * 512 / origin.shape[1])
+            if vis_parsing_anno[_x][_y] == 17:  # 17 = hair
+                b, g, r = origin[x, y]
+                hair_pixels.append([r, g, b])  # RGB
+    return np.array(hair_pixels, dtype=np.uint8).reshape(-1, 3)
+
+
+def full_frame_hair_pixels(origin, mask):
+    """Previous vectorised path: sample the grid mask for every pixel of the frame."""
+    height, width = origin.shape[:2]
+    rows = (np.arange(height) * mask.shape[0] / height).astype(np.intp)
+    cols = (np.arange(width) * mask.shape[1] / width).astype(np.intp)
+    return np.ascontiguousarray(origin[mask[np.ix_(rows, cols)]][:, ::-1], dtype=np.uint8)
+
+
+def selfie_case(rng, height, width):
+    """Hair as an ellipse over the top of the frame, about a quarter of the map."""
+    origin = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    yy, xx = np.mgrid[:512, :512]
+    parsing = np.ones((512, 512), dtype=np.uint8)  # skin
+    parsing[((yy - 150) / 130.0) ** 2 + ((xx - 256) / 170.0) ** 2 < 1] = 17
+    return origin, parsing
+
+
+def random_case(rng, height, width):
+    origin = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    parsing = rng.integers(0, 19, size=(512, 512)).astype(np.uint8)
+    return origin, parsing
+
+
+def check_parity(rng):
+    # Smaller, larger, odd and degenerate frames around the 512 grid
+    sizes = [(1, 1), (7, 13), (511, 513), (512, 512), (640, 480), (1001, 999)]
+    for height, width in sizes:
+        origin, parsing = random_case(rng, height, width)
+        expected = legacy_hair_pixels(origin, parsing)
+        actual = extract_hair_pixels(origin, parsing)
+        assert actual.dtype == np.uint8 and actual.flags["C_CONTIGUOUS"]
+        assert np.array_equal(expected, actual), f"mismatch at {height}x{width}"
+    # No hair at all
+    origin, parsing = random_case(rng, 64, 64)
+    parsing[parsing == 17] = 0
+    assert extract_hair_pixels(origin, parsing).shape == (0, 3)
+    # Hair box, on a BGR view like the pipeline passes, with the ROI options
+    for height, width in [(511, 513), (1001, 999), (1500, 2000)]:
+        origin, parsing = selfie_case(rng, height, width)
+        origin = origin[:, :, ::-1]
+        for bottom_fraction, dilation in [(1.0, 0), (0.5, 0), (1.0, 10), (0.3, 5)]:
+            mask, _ = hair_roi(parsing, 17, bottom_fraction, dilation)
+            expected = full_frame_hair_pixels(origin, mask)
+            actual = extract_hair_pixels(origin, parsing, bottom_fraction=bottom_fraction, dilation=dilation)
+            assert np.array_equal(expected, actual), f"ROI mismatch at {height}x{width} {bottom_fraction} {dilation}"
+        assert np.array_equal(legacy_hair_pixels(origin, parsing), extract_hair_pixels(origin, parsing))
+    print(f"parity OK on {len(sizes) + 4} cases")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", default="1500x2000", help="HxW of the timed frame")
+    parser.add_argument("--skip-legacy", action="store_true", help="only time the vectorised path")
+    args = parser.parse_args()
+    height, width = (int(v) for v in args.size.split("x"))
+
+    rng = np.random.default_rng(0)
+    check_parity(rng)
+
+    origin, parsing = random_case(rng, height, width)
+    start = time.perf_counter()
+    pixels = extract_hair_pixels(origin, parsing)
+    vectorised = time.perf_counter() - start
+    print(f"vectorised: {vectorised * 1000:9.1f} ms  ({len(pixels)} hair pixels, {height}x{width})")
+
+    origin, parsing = selfie_case(rng, height, width)
+    origin = origin[:, :, ::-1]
+    timings = {}
+    for label, fn in [("full frame", lambda: full_frame_hair_pixels(origin, parsing == 17)),
+                      ("hair box", lambda: extract_hair_pixels(origin, parsing)),
+                      ("hair box, bottom 0.5", lambda: extract_hair_pixels(origin, parsing, bottom_fraction=0.5))]:
+        start = time.perf_counter()
+        for _ in range(5):
+            pixels = fn()
+        timings[label] = (time.perf_counter() - start) / 5
+        print(f"selfie, {label + ':':22}{timings[label] * 1000:9.1f} ms  ({len(pixels)} hair pixels)")
+
+    if not args.skip_legacy:
+        start = time.perf_counter()
+        legacy_hair_pixels(origin, parsing)
+        legacy = time.perf_counter() - start
+        print(f"legacy:     {legacy * 1000:9.1f} ms  (x{legacy / vectorised:.0f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Perceptual matching metrics: vectorised ΔE vs. a per-pair loop.
+
+For every metric, scores random users against a catalogue once with the
+vectorised path (user centres converted to Lab, catalogue Lab precomputed)
+and once with a loop that converts and compares one colour pair at a time,
+the way a colormath implementation would. Checks both give the same
+distances, then times them and reports how often each Lab metric picks the
+same best shade as RGB.
+
+    python -m benchmarks.bench_match_metrics --catalogue lighting
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.config import Settings
+from app.services.best_shade_matcher import color_distances, find_best_shade, find_best_shade4, find_best_shade_single
+from app.services.color_metrics import DELTA_E, METRICS, rgb_to_lab
+from app.services.shade_catalogue import get_catalogue
+
+MATCHERS = {"single": find_best_shade_single, "lighting": find_best_shade, "lighting4": find_best_shade4}
+
+
+def random_user(rng):
+    return [
+        {"color": [int(v) for v in rng.integers(0, 256, size=3)], "percentage": float(p)}
+        for p in rng.dirichlet(np.ones(3)) * 100
+    ]
+
+
+def loop_distances(user, compiled, metric):
+    out = np.empty((len(user), len(compiled.colors)))
+    for i, uc in enumerate(user):
+        for j, ref in enumerate(compiled.colors):
+            out[i, j] = DELTA_E[metric](rgb_to_lab(uc["color"])[0], rgb_to_lab(ref)[0])
+    return out * Settings.DELTAE_SCALE
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--catalogue", default="single", choices=sorted(MATCHERS))
+    parser.add_argument("--users", type=int, default=20)
+    args = parser.parse_args()
+
+    compiled = get_catalogue(args.catalogue).snapshot().compiled
+    rng = np.random.default_rng(0)
+    users = [random_user(rng) for _ in range(args.users)]
+    matcher = MATCHERS[args.catalogue]
+    best = {m: [matcher(u, compiled, metric=m)[0] for u in users] for m in METRICS}
+
+    print(f"{args.catalogue}: {len(compiled)} shades, {len(compiled.colors)} reference colours")
+    print(f"{'metric':<11}{'vectorised (ms)':>17}{'loop (ms)':>11}{'same best as rgb':>18}")
+    for metric in METRICS:
+        start = time.perf_counter()
+        vectorised = [color_distances(u, compiled, metric) for u in users]
+        vec_time = (time.perf_counter() - start) / len(users)
+
+        loop = "-"
+        if metric != "rgb":
+            start = time.perf_counter()
+            expected = [loop_distances(u, compiled, metric) for u in users[:3]]
+            loop = f"{(time.perf_counter() - start) / 3 * 1000:.1f}"
+            for e, v in zip(expected, vectorised):
+                assert np.allclose(e, v), f"{metric}: vectorised distances differ from the loop"
+        agree = np.mean([a == b for a, b in zip(best[metric], best["rgb"])])
+        print(f"{metric:<11}{vec_time * 1000:>17.2f}{loop:>11}{agree:>18.0%}")
+
+
+if __name__ == "__main__":
+    main()
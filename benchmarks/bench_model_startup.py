@@ -0,0 +1,49 @@
+"""Cold-start cost of building the BiSeNet parser.
+
+Compares the training-style construction (ImageNet backbone fetch through
+modelzoo + kaiming init) with the inference construction used by the model
+registry, both followed by loading model.pth.
+
+    python -m benchmarks.bench_model_startup --repeat 5
+"""
+import argparse
+import time
+
+import torch
+
+from app.config import Settings
+from app.model import BiSeNet
+
+
+def build(inference, model_path):
+    start = time.perf_counter()
+    net = BiSeNet(n_classes=19, inference=inference)
+    constructed = time.perf_counter()
+    net.load_state_dict(torch.load(str(model_path), map_location=torch.device('cpu')))
+    net.eval()
+    loaded = time.perf_counter()
+    return constructed - start, loaded - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=str(Settings.MODEL_PATH))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'mode':<12}{'construct (ms)':>16}{'construct+load (ms)':>22}")
+    for label, inference in (("pretrained", False), ("inference", True)):
+        try:
+            runs = [build(inference, args.model) for _ in range(args.repeat)]
+        except OSError as e:
+            # urllib errors land here on hosts without internet access
+            print(f"{label:<12}failed: {e}")
+            continue
+        construct = min(r[0] for r in runs) * 1000
+        total = min(r[1] for r in runs) * 1000
+        print(f"{label:<12}{construct:>16.1f}{total:>22.1f}")
+    print("(best of %d; the first pretrained run may also include the download)" % args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Throughput versus latency of BiSeNet micro-batching.
+
+Simulates `--clients` concurrent requests, each parsing `--requests`
+512x512 tensors, once without batching (every thread runs its own
+batch-of-one forward pass) and once per batching window.
+
+    python -m benchmarks.bench_parser_batching --clients 8 --windows 5 10 20
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+import torch
+
+from app.config import Settings
+from app.services.model_registry import get_parser, load_parser
+from app.services.parser_batcher import ParserBatcher
+
+
+def run_clients(parse, clients, requests):
+    latencies = []
+    lock = threading.Lock()
+    tensor = torch.randn(3, 512, 512)
+
+    def client():
+        for _ in range(requests):
+            start = time.perf_counter()
+            parse(tensor)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    return len(latencies) / wall, np.percentile(latencies, 50), np.percentile(latencies, 95)
+
+
+def unbatched_parse(tensor):
+    with torch.no_grad():
+        out = get_parser()(tensor.unsqueeze(0))[0]
+    return out.squeeze(0).numpy().argmax(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=str(Settings.MODEL_PATH))
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=4, help="requests per client")
+    parser.add_argument("--windows", type=float, nargs="+", default=[5, 10, 20])
+    parser.add_argument("--max-batch", type=int, default=8)
+    args = parser.parse_args()
+
+    load_parser(args.model)
+    print(f"{args.clients} clients x {args.requests} requests, torch threads = {torch.get_num_threads()}")
+    print(f"{'window (ms)':<14}{'req/s':>8}{'p50 (ms)':>10}{'p95 (ms)':>10}")
+
+    rps, p50, p95 = run_clients(unbatched_parse, args.clients, args.requests)
+    print(f"{'off':<14}{rps:>8.2f}{p50 * 1000:>10.0f}{p95 * 1000:>10.0f}")
+    for window in args.windows:
+        batcher = ParserBatcher(window, args.max_batch)
+        rps, p50, p95 = run_clients(batcher.parse, args.clients, args.requests)
+        batcher.close()
+        print(f"{window:<14g}{rps:>8.2f}{p50 * 1000:>10.0f}{p95 * 1000:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Hair-class parity and latency of the exported BiSeNet variants.
+
+Exports model.pth with app.model_export into a temporary directory and runs
+every variant on sample images from data/. Reports the hair (class 17) IoU
+and the all-class pixel agreement against the original eager model, plus
+the mean forward latency.
+
+    python -m benchmarks.bench_parser_export --images 8
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+import torch
+import torchvision.transforms as transforms
+from PIL import Image
+
+from app.config import Settings
+from app.model_export import export_all, fuse_conv_bn, load_inference_model
+from app.services.model_registry import OnnxParser
+
+HAIR = 17
+
+
+def sample_tensors(limit):
+    to_tensor = transforms.Compose([
+        transforms.ToTensor(),
+        transforms.Normalize((0.485, 0.456, 0.406), (0.229, 0.224, 0.225)),
+    ])
+    paths = sorted(Settings.DATA_DIR.glob("*/*.jpg"))[:limit]
+    return [to_tensor(Image.open(p).convert("RGB").resize((512, 512))).unsqueeze(0) for p in paths]
+
+
+def run(net, tensors):
+    maps, elapsed = [], 0.0
+    with torch.no_grad():
+        net(tensors[0])  # warm-up
+        for tensor in tensors:
+            start = time.perf_counter()
+            out = net(tensor)[0]
+            elapsed += time.perf_counter() - start
+            maps.append(out.squeeze(0).cpu().numpy().argmax(0))
+    return maps, elapsed / len(tensors)
+
+
+def hair_iou(reference, candidate):
+    inter = union = 0
+    for ref, cand in zip(reference, candidate):
+        inter += np.logical_and(ref == HAIR, cand == HAIR).sum()
+        union += np.logical_or(ref == HAIR, cand == HAIR).sum()
+    return inter / union if union else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=str(Settings.MODEL_PATH))
+    parser.add_argument("--images", type=int, default=8)
+    args = parser.parse_args()
+
+    tensors = sample_tensors(args.images)
+    with tempfile.TemporaryDirectory() as out_dir:
+        artifacts = export_all(args.model, out_dir, int8=True)
+
+        original = load_inference_model(args.model)
+        original.aux_heads = True  # what evaluate() used to run
+        variants = [
+            ("eager + aux heads", original),
+            ("eager", load_inference_model(args.model)),
+            ("eager fused", fuse_conv_bn(load_inference_model(args.model))),
+            ("torchscript fused", torch.jit.load(str(artifacts["torchscript"]))),
+            ("onnx fp32", OnnxParser(artifacts["onnx"])),
+            ("onnx int8", OnnxParser(artifacts["onnx_int8"])),
+        ]
+
+        reference, _ = run(original, tensors)
+        print(f"{len(tensors)} images, torch threads = {torch.get_num_threads()}")
+        print(f"{'variant':<20}{'ms/image':>10}{'hair IoU':>10}{'pixel agree':>13}")
+        for name, net in variants:
+            maps, latency = run(net, tensors)
+            agree = np.mean([(r == m).mean() for r, m in zip(reference, maps)])
+            print(f"{name:<20}{latency * 1000:>10.1f}{hair_iou(reference, maps):>10.4f}{agree:>13.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""CPU throughput of the rembg matting models.
+
+For each model, creates one session (the way the app does at startup) and
+runs background removal over sample images from data/, reporting session
+setup time, mean latency per image and images/second.
+
+    python -m benchmarks.bench_rembg_models --models u2net u2netp isnet-general-use --images 10
+"""
+import argparse
+import time
+
+from PIL import Image
+
+from app.config import Settings
+from app.services.background_remove import _build_session, remove_background
+
+
+def sample_images(limit, max_side):
+    paths = sorted(Settings.DATA_DIR.glob("*/*.jpg"))[:limit]
+    images = []
+    for path in paths:
+        img = Image.open(path).convert("RGBA")
+        img.thumbnail((max_side, max_side))
+        images.append(img)
+    return images
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--models", nargs="+", default=["u2net", "u2netp", "isnet-general-use", "silueta"])
+    parser.add_argument("--images", type=int, default=10)
+    parser.add_argument("--max-side", type=int, default=1024, help="downscale inputs to this long side")
+    args = parser.parse_args()
+
+    images = sample_images(args.images, args.max_side)
+    print(f"{len(images)} images, ORT intra/inter threads = "
+          f"{Settings.ORT_INTRA_OP_THREADS}/{Settings.ORT_INTER_OP_THREADS} (0 = default)")
+    print(f"{'model':<22}{'setup (s)':>10}{'ms/image':>10}{'images/s':>10}")
+    for model_name in args.models:
+        start = time.perf_counter()
+        try:
+            session = _build_session(model_name)
+        except Exception as e:
+            print(f"{model_name:<22}failed: {e}")
+            continue
+        setup = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for img in images:
+            remove_background(img, session=session)
+        elapsed = time.perf_counter() - start
+        per_image = elapsed / len(images)
+        print(f"{model_name:<22}{setup:>10.2f}{per_image * 1000:>10.1f}{1 / per_image:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
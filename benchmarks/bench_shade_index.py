@@ -0,0 +1,84 @@
+"""Shade lookup at catalogue scale: full scoring vs. index + top_k.
+
+Builds synthetic single-layout catalogues (3 colours per shade), scores
+random users against the whole catalogue and through the indexed top_k
+search of find_best_shade_single, checks that both return exactly the same
+top_k, then times them.
+
+    python -m benchmarks.bench_shade_index --sizes 25,1000,50000 --top-k 5 --metric cie76
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.config import Settings
+from app.services.best_shade_matcher import compile_shades, find_best_shade_single, score_single
+from app.services.color_metrics import METRICS
+from app.services.shade_index import get_index
+
+
+def synthetic_catalogue(rng, n_shades):
+    return {
+        f"shade_{i}": [
+            {"color": [int(v) for v in rng.integers(0, 256, size=3)], "percentage": float(p)}
+            for p in rng.dirichlet(np.ones(3)) * 100
+        ]
+        for i in range(n_shades)
+    }
+
+
+def synthetic_user(rng):
+    return [
+        {"color": [int(v) for v in rng.integers(0, 256, size=3)], "percentage": float(p)}
+        for p in rng.dirichlet(np.ones(3)) * 100
+    ]
+
+
+def top_scores(names, totals, top_k):
+    rounded = [round(float(t), 2) for t in totals]
+    ranked = sorted(zip(names, rounded), key=lambda x: x[1], reverse=True)
+    return ranked[:top_k]
+
+
+def full_lookup(user, compiled, top_k, metric):
+    return top_scores(compiled.names, score_single(user, compiled, metric), top_k)
+
+
+def indexed_lookup(user, compiled, top_k, metric):
+    _, scores = find_best_shade_single(user, compiled, top_k, metric)
+    return list(scores.items())
+
+
+def timed(fn, users, compiled, top_k, metric):
+    start = time.perf_counter()
+    results = [fn(user, compiled, top_k, metric) for user in users]
+    return (time.perf_counter() - start) / len(users), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="25,1000,50000")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--metric", default="rgb", choices=METRICS)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    users = [synthetic_user(rng) for _ in range(args.users)]
+    print(f"index={Settings.SHADE_INDEX} oversample={Settings.SHADE_INDEX_OVERSAMPLE} top_k={args.top_k} metric={args.metric}")
+    print(f"{'shades':>8}{'build (ms)':>12}{'full (ms)':>11}{'index (ms)':>12}")
+    for n_shades in (int(v) for v in args.sizes.split(",")):
+        compiled = compile_shades(synthetic_catalogue(rng, n_shades))
+        start = time.perf_counter()
+        get_index(compiled, space="rgb" if args.metric == "rgb" else "lab")
+        build = time.perf_counter() - start
+
+        full_time, full = timed(full_lookup, users, compiled, args.top_k, args.metric)
+        index_time, indexed = timed(indexed_lookup, users, compiled, args.top_k, args.metric)
+        assert full == indexed, f"top_k mismatch at {n_shades} shades"
+        print(f"{n_shades:>8}{build * 1000:>12.1f}{full_time * 1000:>11.2f}{index_time * 1000:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
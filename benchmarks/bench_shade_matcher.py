@@ -0,0 +1,108 @@
+"""Parity check and timing for the vectorised shade matcher.
+
+Re-implements the original loop-based find_best_shade_single,
+find_best_shade and find_best_shade4 (on top of match_score / match_score1)
+and checks that the vectorised versions return exactly the same scores in
+the same order for random user colours on the bundled catalogues. Then
+times both on a catalogue replicated up to `--shades` entries.
+
+    python -m benchmarks.bench_shade_matcher --shades 1000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.config import Settings
+from app.services.best_shade_matcher import (
+    compile_shades, find_best_shade, find_best_shade4, find_best_shade_single,
+    match_score, match_score1, LIGHTING_KEYS, LIGHTING4_KEYS,
+)
+
+
+def legacy_single(user_colors, reference_shades):
+    scores = {name: round(match_score(user_colors, colors), 2) for name, colors in reference_shades.items()}
+    return dict(sorted(scores.items(), key=lambda x: x[1], reverse=True))
+
+
+def legacy_lighting(user_colors, reference_shades, light_keys):
+    scores = {}
+    for shade_name, light_types in reference_shades.items():
+        total = 0
+        for light_type in light_keys:
+            if light_type in light_types:
+                total += match_score1(user_colors, light_types[light_type])
+        scores[shade_name] = round(total / len(light_keys), 2)
+    return dict(sorted(scores.items(), key=lambda x: x[1], reverse=True))
+
+
+def random_user(rng, pool=None):
+    """1-3 random colours; with a pool, colours near catalogue colours so
+    every distance tier gets exercised."""
+    n = int(rng.integers(1, 4))
+    pct = rng.dirichlet(np.ones(n)) * 100
+    if pool is None:
+        colors = rng.integers(0, 256, (n, 3))
+    else:
+        colors = np.clip(pool[rng.integers(0, len(pool), n)] + rng.integers(-40, 41, (n, 3)), 0, 255)
+    return [{"color": c.tolist(), "percentage": float(round(p, 2))} for c, p in zip(colors, pct)]
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def check_parity(rng, trials):
+    catalogues = [
+        ("single", load(Settings.N_SHADE_PATH), legacy_single, find_best_shade_single, None),
+        ("lighting", load(Settings.SHADE_PATH),
+         lambda u, r: legacy_lighting(u, r, LIGHTING_KEYS), find_best_shade, LIGHTING_KEYS),
+        ("lighting4", load(Settings.N4_SHADE_PATH),
+         lambda u, r: legacy_lighting(u, r, LIGHTING4_KEYS), find_best_shade4, LIGHTING4_KEYS),
+    ]
+    for label, shades, legacy, vectorised, keys in catalogues:
+        compiled = compile_shades(shades, keys)
+        pool = compiled.colors.astype(int)
+        for trial in range(trials):
+            user = random_user(rng, pool if trial % 2 else None)
+            expected = legacy(user, shades)
+            _, actual = vectorised(user, compiled)
+            assert list(expected) == list(actual), f"{label}: order differs for {user}"
+            assert all(expected[k] == actual[k] for k in expected), f"{label}: scores differ for {user}"
+        print(f"parity OK: {label} ({len(shades)} shades, {trials} random users)")
+
+
+def scaled(shades, size):
+    names = list(shades)
+    return {f"{names[i % len(names)]} #{i}": shades[names[i % len(names)]] for i in range(size)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trials", type=int, default=200)
+    parser.add_argument("--shades", type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    check_parity(rng, args.trials)
+
+    shades = scaled(load(Settings.SHADE_PATH), args.shades)
+    user = random_user(rng)
+    start = time.perf_counter()
+    compiled = compile_shades(shades, LIGHTING_KEYS)
+    compile_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    find_best_shade(user, compiled)
+    vectorised = time.perf_counter() - start
+    start = time.perf_counter()
+    legacy_lighting(user, shades, LIGHTING_KEYS)
+    legacy = time.perf_counter() - start
+    print(f"{args.shades} shades: legacy {legacy * 1000:.1f} ms, vectorised {vectorised * 1000:.1f} ms "
+          f"(+ {compile_time * 1000:.1f} ms one-off compile)")
+
+
+if __name__ == "__main__":
+    main()
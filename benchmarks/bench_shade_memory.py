@@ -0,0 +1,121 @@
+"""Peak memory of detect_shade_color: per-pixel lists vs. the array path.
+
+Each run happens in a fresh subprocess that reports its peak RSS (from
+getrusage) after importing the models and after the call, so the delta is
+the cost of the call alone. The legacy path builds one Python object per
+channel per pixel and needs several GB at 24 MP, more than many hosts
+have, so it is measured at --legacy-mp sizes and extrapolated linearly.
+Both paths must return the same colours.
+
+    python -m benchmarks.bench_shade_memory --mp 24 --legacy-mp 1,2,4
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def legacy_detect_shade_color(input_path):
+    from app.services.hair_color_detector import get_dominant_colors_from_hair
+
+    img = Image.open(input_path).convert("RGB")
+    pixels_array = np.array(img).reshape(-1, 3)
+    pixels = [[np.uint8(ch) for ch in pixel] for pixel in pixels_array]
+    dominant_colors = get_dominant_colors_from_hair(pixels, n_clusters=3, min_percentage=3)
+    dominant_colors = dominant_colors.get("dominant_hair_colors", [])
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "shade_rgb.json")
+        with open(path, "w") as f:
+            json.dump({"dominant_hair_colors": dominant_colors}, f)
+        with open(path) as f:
+            return json.load(f)["dominant_hair_colors"]
+
+
+def child(variant, path):
+    from app.services.hair_color_detector import detect_shade_color
+
+    baseline = peak_rss_mb()
+    if variant == "legacy":
+        colors = legacy_detect_shade_color(path)
+    else:
+        colors = [{k: v for k, v in c.items() if k != "lab"} for c in detect_shade_color(path)]
+    print(json.dumps({"baseline": baseline, "peak": peak_rss_mb(), "colors": colors}))
+
+
+def synthetic_image(path, megapixels):
+    # Smooth gradients plus noise: a few clusters, like a product photo
+    height = int(round((megapixels * 1e6 * 3 / 4) ** 0.5))
+    width = int(round(megapixels * 1e6 / height))
+    rng = np.random.default_rng(0)
+    yy = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    xx = np.linspace(0, 1, width, dtype=np.float32)[None, :]
+    base = np.stack([90 + 60 * yy + 0 * xx, 60 + 40 * xx + 0 * yy, 40 + 30 * yy * xx], axis=2)
+    img = np.clip(base + rng.normal(0, 8, size=(height, width, 3)).astype(np.float32), 0, 255).astype(np.uint8)
+    Image.fromarray(img).save(path, quality=95)
+    return height, width
+
+
+def measure(variant, path):
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_shade_memory", "--child", variant, path],
+        capture_output=True, text=True,
+    )
+    if out.returncode != 0:
+        return None
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mp", type=float, default=24.0, help="megapixels for the array path")
+    parser.add_argument("--legacy-mp", default="1,2,4", help="megapixel sizes for the legacy path")
+    parser.add_argument("--child", nargs=2, metavar=("VARIANT", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    legacy_sizes = [float(v) for v in args.legacy_mp.split(",") if v]
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'variant':<8}{'MP':>6}{'baseline (MB)':>15}{'peak (MB)':>11}{'call (MB)':>11}")
+        rows = []
+        for variant, sizes in (("legacy", legacy_sizes), ("array", sorted(set(legacy_sizes + [args.mp])))):
+            for mp in sizes:
+                path = os.path.join(tmp, f"{mp:g}mp.jpg")
+                if not os.path.exists(path):
+                    synthetic_image(path, mp)
+                result = measure(variant, path)
+                if result is None:
+                    print(f"{variant:<8}{mp:>6g}  failed (out of memory?)")
+                    continue
+                delta = result["peak"] - result["baseline"]
+                rows.append((variant, mp, delta, result["colors"]))
+                print(f"{variant:<8}{mp:>6g}{result['baseline']:>15.0f}{result['peak']:>11.0f}{delta:>11.0f}")
+
+        by_size = {}
+        for variant, mp, _, colors in rows:
+            by_size.setdefault(mp, {})[variant] = colors
+        for mp, colors in by_size.items():
+            if len(colors) == 2:
+                assert colors["legacy"] == colors["array"], f"colours differ at {mp:g} MP"
+        print("colours identical at every size measured with both paths")
+
+        legacy = [(mp, delta) for variant, mp, delta, _ in rows if variant == "legacy"]
+        if len(legacy) >= 2:
+            slope, intercept = np.polyfit(*zip(*legacy), 1)
+            print(f"legacy extrapolated to {args.mp:g} MP: ~{slope * args.mp + intercept:.0f} MB "
+                  f"({slope:.0f} MB per MP)")
+
+
+if __name__ == "__main__":
+    main()
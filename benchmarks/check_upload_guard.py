@@ -0,0 +1,66 @@
+"""Upload guard verdicts for valid, truncated and non-image uploads.
+
+Each case is run through sniff_image (the header check in the routes) and
+decode_image (the pipeline's decode stage); the first one to reject an
+upload decides its HTTP status. A truncated JPEG has a valid header, so
+it must get past the sniff and be rejected by the decode as 415, not
+surface as a 500.
+
+    python -m benchmarks.check_upload_guard
+"""
+import argparse
+import io
+import sys
+
+from PIL import Image
+
+from app.config import Settings
+from app.services.upload_guard import UnsupportedImage, UploadTooLarge, decode_image, sniff_image
+
+STATUS = {UnsupportedImage: 415, UploadTooLarge: 413}
+
+
+def encode(size, fmt="JPEG"):
+    buf = io.BytesIO()
+    Image.new("RGB", size, (120, 80, 40)).save(buf, format=fmt)
+    return buf.getvalue()
+
+
+def cases():
+    jpeg = encode((640, 480))
+    return [
+        ("jpeg", jpeg, 200),
+        ("png", encode((640, 480), "PNG"), 200),
+        ("truncated jpeg", jpeg[:len(jpeg) // 2], 415),
+        ("jpeg header only", jpeg[:200], 415),
+        ("not an image", b"%PDF-1.4\n" + b"0" * 1024, 415),
+        ("empty", b"", 415),
+    ]
+
+
+def verdict(data, max_side):
+    try:
+        sniff_image(data, "upload")
+        decode_image(data, max_side=max_side, name="upload")
+    except (UnsupportedImage, UploadTooLarge) as e:
+        return STATUS[type(e)], str(e)
+    return 200, ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-side", type=int, default=Settings.ANALYSIS_MAX_SIDE)
+    args = parser.parse_args()
+
+    failed = 0
+    print(f"{'case':<20}{'expected':>10}{'got':>6}  detail")
+    for name, data, expected in cases():
+        status, detail = verdict(data, args.max_side)
+        failed += status != expected
+        mark = "" if status == expected else "  <-- MISMATCH"
+        print(f"{name:<20}{expected:>10}{status:>6}  {detail}{mark}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Colour-match agreement of reduced analysis resolutions vs. full resolution.
+
+Runs every image under --dir through the match pipeline (optionally with
+rembg) once at full resolution and once per --max-side value, then reports
+how often the best shade is the same, the mean change in the best shade's
+match percentage and the mean latency of each setting.
+
+    python -m benchmarks.eval_analysis_resolution --dir data --max-side 2048,1024,512
+"""
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.config import Settings
+from app.services.any_formate import load_image_any_format
+from app.services.best_shade_matcher import find_best_shade, find_best_shade4, find_best_shade_single
+from app.services.hair_color_detector import detect_hair_color
+from app.services.model_registry import load_parser
+from app.services.shade_catalogue import get_catalogue
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".heic", ".heif")
+MATCHERS = {"single": find_best_shade_single, "lighting": find_best_shade, "lighting4": find_best_shade4}
+
+
+def match(data, max_side, catalogue, use_rembg):
+    start = time.perf_counter()
+    image = load_image_any_format(data, max_side=max_side or None)
+    if use_rembg:
+        from app.services.background_remove import remove_background
+        image = remove_background(image)
+    response = detect_hair_color(image)
+    best, scores = (None, {})
+    if response["status_code"] == 200:
+        best, scores = MATCHERS[catalogue](response["dominant_hair_colors"], get_catalogue(catalogue).snapshot().compiled)
+    return best, scores.get(best, 0.0), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", default=str(Settings.DATA_DIR))
+    parser.add_argument("--max-side", default="2048,1024,512")
+    parser.add_argument("--catalogue", default="single", choices=sorted(MATCHERS))
+    parser.add_argument("--model", default=str(Settings.MODEL_PATH))
+    parser.add_argument("--rembg", action="store_true", help="remove the background first, like the API")
+    parser.add_argument("--limit", type=int, default=0, help="only the first N images")
+    args = parser.parse_args()
+
+    load_parser(args.model)
+    paths = sorted(p for p in Path(args.dir).rglob("*") if p.suffix.lower() in IMAGE_SUFFIXES)
+    if args.limit:
+        paths = paths[:args.limit]
+    sides = [int(v) for v in args.max_side.split(",") if v]
+
+    full, reduced = [], {side: [] for side in sides}
+    for path in paths:
+        data = path.read_bytes()
+        full.append(match(data, 0, args.catalogue, args.rembg))
+        for side in sides:
+            reduced[side].append(match(data, side, args.catalogue, args.rembg))
+
+    print(f"{len(paths)} images from {args.dir}, catalogue={args.catalogue}, rembg={args.rembg}")
+    print(f"{'max side':>9}{'same best':>11}{'mean |Δ%|':>11}{'latency (ms)':>14}")
+    print(f"{'full':>9}{'-':>11}{'-':>11}{np.mean([r[2] for r in full]) * 1000:>14.1f}")
+    for side in sides:
+        runs = reduced[side]
+        same = np.mean([f[0] == r[0] for f, r in zip(full, runs)])
+        delta = np.mean([abs(f[1] - r[1]) for f, r in zip(full, runs)])
+        print(f"{side:>9}{same:>11.0%}{delta:>11.2f}{np.mean([r[2] for r in runs]) * 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
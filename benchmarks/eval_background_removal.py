@@ -0,0 +1,71 @@
+"""Latency saved and match agreement when rembg is skipped.
+
+Runs every image under --dir through the match pipeline with
+BACKGROUND_REMOVAL=always (the reference), =never and =auto at each
+--min-confidence, then reports how often the best shade matches the
+reference, the mean change in its match percentage, the mean latency and
+the share of images that still went through rembg.
+
+    python -m benchmarks.eval_background_removal --dir data --min-confidence 0.8,0.9,0.95
+"""
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from app.config import Settings
+from app.services.background_remove import load_session
+from app.services.hair_pipeline import match_hair_image_timed
+from app.services.model_registry import load_parser
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".heic", ".heif")
+
+
+def run(data, mode, min_confidence=None):
+    Settings.BACKGROUND_REMOVAL = mode
+    if min_confidence is not None:
+        Settings.BACKGROUND_REMOVAL_MIN_CONFIDENCE = min_confidence
+    result, timings = match_hair_image_timed(data)
+    best = result["matched_shade"]
+    seconds = sum(s for _, s in timings["stages"])
+    rembg = any(name == "background_removal" for name, _ in timings["stages"])
+    return best, result["match_percentage"], seconds, rembg
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", default=str(Settings.DATA_DIR))
+    parser.add_argument("--min-confidence", default="0.8,0.9,0.95")
+    parser.add_argument("--model", default=str(Settings.MODEL_PATH))
+    parser.add_argument("--limit", type=int, default=0, help="only the first N images")
+    args = parser.parse_args()
+
+    load_parser(args.model)
+    load_session()
+    paths = sorted(p for p in Path(args.dir).rglob("*") if p.suffix.lower() in IMAGE_SUFFIXES)
+    if args.limit:
+        paths = paths[:args.limit]
+    settings = [("never", None)] + [("auto", float(v)) for v in args.min_confidence.split(",") if v]
+
+    reference, runs = [], {setting: [] for setting in settings}
+    for path in paths:
+        data = path.read_bytes()
+        reference.append(run(data, "always"))
+        for setting in settings:
+            runs[setting].append(run(data, *setting))
+
+    base = np.mean([r[2] for r in reference])
+    print(f"{len(paths)} images from {args.dir}, reference: BACKGROUND_REMOVAL=always")
+    print(f"{'mode':>12}{'same best':>11}{'mean |Δ%|':>11}{'latency (ms)':>14}{'saved':>8}{'rembg':>8}")
+    print(f"{'always':>12}{'-':>11}{'-':>11}{base * 1000:>14.1f}{'-':>8}{'100%':>8}")
+    for (mode, min_confidence), results in runs.items():
+        label = mode if min_confidence is None else f"auto@{min_confidence:g}"
+        same = np.mean([r[0] == f[0] for f, r in zip(reference, results)])
+        delta = np.mean([abs(f[1] - r[1]) for f, r in zip(reference, results)])
+        latency = np.mean([r[2] for r in results])
+        rembg = np.mean([r[3] for r in results])
+        print(f"{label:>12}{same:>11.0%}{delta:>11.2f}{latency * 1000:>14.1f}{1 - latency / base:>8.0%}{rembg:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Agreement of the hair-only parser path with the full 19-class argmax.
+
+For each image, takes the hair mask from the full path (argmax == 17 at
+512x512) as reference and the mask from the hair-only path (decision at
+1/8 resolution, single-channel upsampling) as candidate. Reports mean
+hair IoU, binary mIoU (hair and not-hair) and the latency of both paths.
+
+    python -m benchmarks.eval_hair_only_parsing --images 40
+    python -m benchmarks.eval_hair_only_parsing --dir path/to/selfies
+"""
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import torchvision.transforms as transforms
+from PIL import Image
+
+from app.config import Settings
+from app.services.hair_parser import HAIR_LABEL, parse_full, parse_hair_only
+from app.services.model_registry import load_parser
+
+
+def iou(a, b):
+    union = np.logical_or(a, b).sum()
+    return np.logical_and(a, b).sum() / union if union else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=str(Settings.MODEL_PATH))
+    parser.add_argument("--dir", default=str(Settings.DATA_DIR), help="folder searched recursively for images")
+    parser.add_argument("--images", type=int, default=40)
+    args = parser.parse_args()
+
+    net = load_parser(args.model, backend="torch")
+    to_tensor = transforms.Compose([
+        transforms.ToTensor(),
+        transforms.Normalize((0.485, 0.456, 0.406), (0.229, 0.224, 0.225)),
+    ])
+    paths = sorted(p for p in Path(args.dir).rglob("*") if p.suffix.lower() in (".jpg", ".jpeg", ".png"))
+    paths = paths[:args.images]
+
+    hair_ious, miou, full_time, hair_time = [], [], 0.0, 0.0
+    for path in paths:
+        batch = to_tensor(Image.open(path).convert("RGB").resize((512, 512))).unsqueeze(0)
+
+        start = time.perf_counter()
+        reference = parse_full(net, batch)[0] == HAIR_LABEL
+        full_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        candidate = parse_hair_only(net, batch)[0] == HAIR_LABEL
+        hair_time += time.perf_counter() - start
+
+        hair_ious.append(iou(reference, candidate))
+        miou.append((hair_ious[-1] + iou(~reference, ~candidate)) / 2)
+
+    n = len(paths)
+    print(f"{n} images from {args.dir}")
+    print(f"hair IoU           mean {np.mean(hair_ious):.4f}  min {np.min(hair_ious):.4f}")
+    print(f"binary mIoU        mean {np.mean(miou):.4f}")
+    print(f"full path          {full_time / n * 1000:.1f} ms/image")
+    print(f"hair-only path     {hair_time / n * 1000:.1f} ms/image")
+
+
+if __name__ == "__main__":
+    main()